@@ -0,0 +1,20 @@
+"""Numeric settings from the environment.
+
+An unset, empty or unparseable variable gives the default. Bounds are the
+caller's business: each setting clamps to its own range at the call site.
+"""
+import os
+
+
+def env_float(k: str, default: float) -> float:
+    try:
+        return float(os.getenv(k) or default)
+    except ValueError:
+        return float(default)
+
+
+def env_int(k: str, default: int) -> int:
+    try:
+        return int(os.getenv(k) or default)
+    except ValueError:
+        return int(default)
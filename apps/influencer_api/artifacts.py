@@ -0,0 +1,123 @@
+"""Local artifact store for generated images and videos.
+
+Artifacts are plain files named by a random id plus extension, laid out as
+<root>/<id[:2]>/<id>, so any worker on the host can serve any artifact without a
+lookup table. Callers hand out URLs (/artifacts/<id>) instead of inlining bytes.
+
+Artifacts owned by a job are deleted when the job is evicted. Temp artifacts
+(one-off responses, provider downloads, locally assembled videos) live under
+<root>/tmp/ and are reaped once they are older than the temp TTL.
+
+Env:
+  ARTIFACT_DIR              storage root (default <tmp>/influencer_artifacts)
+  ARTIFACT_PUBLIC_BASE_URL  prefix for returned URLs, e.g. https://influencer-api.onrender.com
+                            (default: relative /artifacts/<id>)
+  ARTIFACT_TEMP_TTL_S       age after which temp artifacts are reaped (default 86400)
+"""
+import contextlib, mimetypes, os, re, tempfile, time, urllib.parse, uuid
+from typing import Iterator, Optional, Tuple
+
+from ._env import env_float
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}\.(png|jpg|jpeg|webp|mp4)$")
+
+
+class ArtifactStore:
+    def __init__(self, root: str, public_base: str = "", temp_ttl_s: float = 86400.0):
+        self.root = root
+        self.temp_root = os.path.join(root, "tmp")
+        self.public_base = public_base.rstrip("/")
+        self.temp_ttl_s = temp_ttl_s
+        os.makedirs(self.temp_root, exist_ok=True)
+
+    def new_id(self, ext: str) -> str:
+        return f"{uuid.uuid4().hex}.{ext.lstrip('.').lower()}"
+
+    def path(self, artifact_id: str, temp: bool = False) -> Optional[str]:
+        """Filesystem path for an id, or None if the id is malformed."""
+        if not _ID_RE.match(artifact_id or ""):
+            return None
+        return os.path.join(self.temp_root if temp else self.root, artifact_id[:2], artifact_id)
+
+    def locate(self, artifact_id: str) -> Optional[str]:
+        """Path of an existing artifact (kept or temp), or None."""
+        for temp in (False, True):
+            p = self.path(artifact_id, temp)
+            if p and os.path.isfile(p):
+                return p
+        return None
+
+    def id_from_url(self, url: str) -> Optional[str]:
+        """Artifact id if `url`'s path is /artifacts/<id>, whatever the host.
+
+        Clients echo our URLs back through their own origin (the dashboard
+        forwards img.src), so the host can't be trusted to be ours; `locate()`
+        decides whether the id actually exists here.
+        """
+        path = urllib.parse.urlsplit(url).path
+        if not path.startswith("/artifacts/"):
+            return None
+        artifact_id = path[len("/artifacts/"):]
+        return artifact_id if _ID_RE.match(artifact_id) else None
+
+    def url(self, artifact_id: str) -> str:
+        return f"{self.public_base}/artifacts/{artifact_id}"
+
+    def content_type(self, artifact_id: str) -> str:
+        return mimetypes.guess_type(artifact_id)[0] or "application/octet-stream"
+
+    @contextlib.contextmanager
+    def writer(self, ext: str, temp: bool = False) -> Iterator[Tuple[str, str]]:
+        """Yield (artifact_id, scratch path); the file is published under the id only if the block succeeds.
+
+        The scratch path keeps the real extension, so tools that pick a
+        container from the file name (ffmpeg) can write to it directly.
+        """
+        artifact_id = self.new_id(ext)
+        p = self.path(artifact_id, temp)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        stem, dot_ext = os.path.splitext(p)
+        part = f"{stem}.part{dot_ext}"
+        try:
+            yield artifact_id, part
+            os.replace(part, p)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(part)
+            raise
+
+    def save_bytes(self, data: bytes, ext: str, temp: bool = False) -> str:
+        with self.writer(ext, temp) as (artifact_id, part):
+            with open(part, "wb") as f:
+                f.write(data)
+        return artifact_id
+
+    def delete(self, artifact_id: str) -> None:
+        for temp in (False, True):
+            p = self.path(artifact_id, temp)
+            if p:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(p)
+
+    def reap(self) -> int:
+        """Delete temp artifacts (and abandoned partial writes) older than the temp TTL."""
+        cutoff = time.time() - self.temp_ttl_s
+        removed = 0
+        for dirpath, _, names in os.walk(self.temp_root):
+            for n in names:
+                p = os.path.join(dirpath, n)
+                try:
+                    if os.stat(p).st_mtime < cutoff:
+                        os.remove(p)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+def from_env() -> ArtifactStore:
+    return ArtifactStore(
+        root=os.getenv("ARTIFACT_DIR") or os.path.join(tempfile.gettempdir(), "influencer_artifacts"),
+        public_base=os.getenv("ARTIFACT_PUBLIC_BASE_URL") or "",
+        temp_ttl_s=env_float("ARTIFACT_TEMP_TTL_S", 86400),
+    )
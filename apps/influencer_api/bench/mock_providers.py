@@ -0,0 +1,231 @@
+"""Local stand-ins for every provider the influencer API calls.
+
+Serves the exact endpoints main.py uses -- FLUX (/text-to-image,
+/image-to-image), the upscaler (/upscale), Gemini (/image-compose), the
+Higgsfield platform API (/image2video, /jobs/{id}) and Supabase Storage
+(object PUT/HEAD plus the TUS resumable endpoint) -- with configurable
+latency, failure rates and payload sizes, so throughput can be measured
+without spending provider credits.
+
+Configured through BENCH_MOCK_CONFIG (JSON), e.g.
+  {"latency": {"default": {"median_ms": 200, "p95_ms": 800},
+               "image-compose": {"median_ms": 1500, "p95_ms": 4000}},
+   "failure_rate": {"default": 0.0, "upscale": 0.05},
+   "image_px": [768, 1024], "video_bytes": 2000000,
+   "job": {"median_ms": 3000, "p95_ms": 8000}}
+
+Latencies are log-normal around the median, shaped so that the given p95
+holds. Failures return HTTP 503. Run with:
+  uvicorn apps.influencer_api.bench.mock_providers:app --port 9100
+"""
+import asyncio, base64, hashlib, io, json, math, os, random, time, uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from PIL import Image
+
+CONFIG: Dict[str, Any] = json.loads(os.getenv("BENCH_MOCK_CONFIG") or "{}")
+
+app = FastAPI()
+
+_JOBS: Dict[str, float] = {}  # job id -> time it completes
+_OBJECTS: Dict[str, int] = {}  # storage key -> size
+_UPLOADS: Dict[str, Dict[str, Any]] = {}  # TUS upload id -> state
+_IMAGES: List[bytes] = []
+_GIFS: Dict[int, bytes] = {}  # moodboard n -> GIF re-save
+_STATS: Dict[str, int] = {"moodboard_requests": 0, "moodboard_304": 0}
+
+
+def _sample_ms(spec: Dict[str, Any]) -> float:
+    median = float(spec.get("median_ms", 0))
+    if median <= 0:
+        return 0.0
+    p95 = float(spec.get("p95_ms", median))
+    sigma = math.log(max(p95, median) / median) / 1.645
+    return random.lognormvariate(math.log(median), sigma)
+
+
+async def _simulate(endpoint: str) -> None:
+    """Sleep for the endpoint's sampled latency; raise a 503 at its failure rate."""
+    latency = CONFIG.get("latency") or {}
+    await asyncio.sleep(_sample_ms(latency.get(endpoint) or latency.get("default") or {}) / 1000)
+    rates = CONFIG.get("failure_rate") or {}
+    if random.random() < float(rates.get(endpoint, rates.get("default", 0.0))):
+        raise _Failure()
+
+
+class _Failure(Exception):
+    pass
+
+
+@app.exception_handler(_Failure)
+async def _failure(request: Request, exc: _Failure):
+    return Response(json.dumps({"error": "injected failure"}), status_code=503, media_type="application/json")
+
+
+def _image_png() -> bytes:
+    # A handful of noisy PNGs generated up front: realistic sizes, no per-request encode cost
+    if not _IMAGES:
+        w, h = CONFIG.get("image_px") or [768, 1024]
+        for _ in range(4):
+            img = Image.frombytes("RGB", (w, h), os.urandom(w * h * 3))
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", compress_level=1)
+            _IMAGES.append(buf.getvalue())
+    return random.choice(_IMAGES)
+
+
+def _data_url() -> str:
+    return "data:image/png;base64," + base64.b64encode(_image_png()).decode("ascii")
+
+
+@app.on_event("startup")
+async def _warm():
+    await asyncio.to_thread(_image_png)
+
+
+@app.get("/health")
+async def health():
+    return {"ok": True}
+
+
+@app.post("/text-to-image")
+async def text_to_image(request: Request):
+    await request.body()
+    await _simulate("text-to-image")
+    return {"image": _data_url()}
+
+
+@app.post("/image-to-image")
+async def image_to_image(request: Request):
+    await request.body()
+    await _simulate("image-to-image")
+    return {"image": _data_url()}
+
+
+@app.post("/upscale")
+async def upscale(request: Request):
+    await request.body()
+    await _simulate("upscale")
+    return {"image": _data_url()}
+
+
+@app.post("/image-compose")
+async def image_compose(request: Request):
+    await request.body()
+    await _simulate("image-compose")
+    return {"image": _data_url()}
+
+
+def _moodboard_body(n: int, fmt: str) -> bytes:
+    _image_png()
+    body = _IMAGES[n % len(_IMAGES)]
+    if fmt == "gif":
+        # Callers hand in whatever their boards were saved as; GIF exercises the decode path
+        if n not in _GIFS:
+            buf = io.BytesIO()
+            Image.open(io.BytesIO(body)).save(buf, format="GIF")
+            _GIFS[n] = buf.getvalue()
+        body = _GIFS[n]
+    return body
+
+
+@app.get("/moodboard/{n}.{fmt}")
+async def moodboard(n: int, fmt: str, request: Request):
+    if fmt not in ("png", "gif"):
+        return Response(status_code=404)
+    await _simulate("moodboard")
+    body = await asyncio.to_thread(_moodboard_body, n, fmt)
+    # Validators like a storage CDN's, so conditional requests can be exercised
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    _STATS["moodboard_requests"] += 1
+    if request.headers.get("if-none-match") == etag:
+        _STATS["moodboard_304"] += 1
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type=f"image/{fmt}", headers={"ETag": etag, "Cache-Control": "max-age=3600"})
+
+
+@app.post("/image2video")
+async def image2video(request: Request):
+    await request.body()
+    await _simulate("image2video")
+    job_id = uuid.uuid4().hex
+    _JOBS[job_id] = time.time() + _sample_ms(CONFIG.get("job") or {"median_ms": 3000, "p95_ms": 6000}) / 1000
+    return {"job_id": job_id}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, request: Request):
+    await _simulate("jobs")
+    done_at = _JOBS.get(job_id)
+    if done_at is None:
+        return Response(json.dumps({"error": "unknown job"}), status_code=404, media_type="application/json")
+    if time.time() < done_at:
+        return {"status": "queued"}
+    return {"status": "completed", "video_url": f"{str(request.base_url).rstrip('/')}/videos/{job_id}.mp4"}
+
+
+@app.get("/videos/{job_id}.mp4")
+async def video(job_id: str):
+    await _simulate("video-download")
+    size = int(CONFIG.get("video_bytes") or 2_000_000)
+    chunk = os.urandom(min(size, 64 * 1024))
+
+    async def _body():
+        left = size
+        while left > 0:
+            n = min(left, len(chunk))
+            yield chunk[:n]
+            left -= n
+
+    return StreamingResponse(_body(), media_type="video/mp4", headers={"Content-Length": str(size)})
+
+
+@app.api_route("/storage/v1/object/{bucket}/{key:path}", methods=["PUT", "POST", "HEAD"])
+async def storage_object(bucket: str, key: str, request: Request):
+    if request.method == "HEAD":
+        return Response(status_code=200 if key in _OBJECTS else 404)
+    size = 0
+    async for block in request.stream():
+        size += len(block)
+    await _simulate("storage")
+    # Like Supabase: an existing object is only replaced with x-upsert
+    if key in _OBJECTS and (request.headers.get("x-upsert") or "").lower() != "true":
+        return Response(status_code=400, content=json.dumps({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}), media_type="application/json")
+    _OBJECTS[key] = size
+    return {"Key": f"{bucket}/{key}"}
+
+
+@app.post("/storage/v1/upload/resumable")
+async def storage_resumable_create(request: Request):
+    await _simulate("storage")
+    upload_id = uuid.uuid4().hex
+    meta = dict(p.split(" ", 1) for p in (request.headers.get("upload-metadata") or "").split(",") if " " in p)
+    name = base64.b64decode(meta.get("objectName", "")).decode("utf-8")
+    _UPLOADS[upload_id] = {"length": int(request.headers.get("upload-length") or 0), "offset": 0, "key": name}
+    return Response(status_code=201, headers={"Location": f"/storage/v1/upload/resumable/{upload_id}", "Tus-Resumable": "1.0.0"})
+
+
+@app.api_route("/storage/v1/upload/resumable/{upload_id}", methods=["PATCH", "HEAD"])
+async def storage_resumable_patch(upload_id: str, request: Request):
+    up = _UPLOADS.get(upload_id)
+    if up is None:
+        return Response(status_code=404)
+    if request.method == "HEAD":
+        return Response(status_code=200, headers={"Upload-Offset": str(up["offset"]), "Upload-Length": str(up["length"])})
+    if int(request.headers.get("upload-offset") or -1) != up["offset"]:
+        return Response(status_code=409)
+    size = 0
+    async for block in request.stream():
+        size += len(block)
+    await _simulate("storage")
+    up["offset"] += size
+    if up["offset"] >= up["length"]:
+        _OBJECTS[up["key"]] = up["length"]
+    return Response(status_code=204, headers={"Upload-Offset": str(up["offset"]), "Tus-Resumable": "1.0.0"})
+
+
+@app.get("/stats")
+async def stats():
+    return {"jobs": len(_JOBS), "objects": len(_OBJECTS), "stored_bytes": sum(_OBJECTS.values()), **_STATS}
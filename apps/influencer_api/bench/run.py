@@ -0,0 +1,280 @@
+"""Offline benchmark driver for the influencer API.
+
+Starts the mock providers and the API (uvicorn, one worker each) on free local
+ports, points every provider env var at the mocks, then drives the chosen
+scenarios at a fixed concurrency and reports p50/p95/p99 latency, throughput,
+errors, and the API process's peak RSS and thread count (read from /proc, so
+Linux only).
+
+  python -m apps.influencer_api.bench.run --scenario bundle --concurrency 4 --requests 20
+  python -m apps.influencer_api.bench.run --scenario all --latency-ms 300 --p95-ms 1200 \\
+      --failure-rate 0.02 --image-px 1536x2048 --json results.json
+
+Scenarios: bundle (/run-full-to-slack), character (/character/build, timed
+until the job finishes), video (/video-from-stills), still (/still). The last
+--gif-moodboards of each bundle's moodboards (and the still's moodboard, if
+any) are served as GIF, so inputs that need decoding are covered. The result cache and the
+identity registry are off unless --cache is given, so repeated runs measure
+provider round trips.
+"""
+import argparse, asyncio, json, os, socket, subprocess, sys, tempfile, threading, time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("bundle", "character", "video", "still")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _proc_status(pid: int) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, val = line.partition(":")
+                if key in ("VmRSS", "VmHWM", "Threads"):
+                    out[key] = int(val.split()[0])
+    except OSError:
+        pass
+    return out
+
+
+def _reset_hwm(pid: int) -> bool:
+    """Reset the process's VmHWM to its current RSS (Linux); False when that isn't possible."""
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class _Sampler(threading.Thread):
+    """Polls the API process for RSS and thread count while the load runs.
+
+    VmHWM is a lifetime high-water mark, so it is reset when the sampler starts;
+    each scenario then reports its own peak rather than the largest so far.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_kb = 0
+        self.peak_threads = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        # Without a reset the mark covers earlier scenarios too; fall back to sampled RSS alone
+        use_hwm = _reset_hwm(self.pid)
+        while not self._done.is_set():
+            st = _proc_status(self.pid)
+            self.peak_rss_kb = max(self.peak_rss_kb, st.get("VmHWM", 0) if use_hwm else 0, st.get("VmRSS", 0))
+            self.peak_threads = max(self.peak_threads, st.get("Threads", 0))
+            self._done.wait(self.interval)
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def _start(module_app: str, port: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def _wait_healthy(base: str, proc: subprocess.Popen, timeout_s: float = 60) -> None:
+    deadline = time.time() + timeout_s
+    async with httpx.AsyncClient() as c:
+        while time.time() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{base} exited during startup (code {proc.returncode})")
+            try:
+                if (await c.get(f"{base}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base} did not become healthy")
+
+
+async def _one(c: httpx.AsyncClient, api: str, mock: str, scenario: str, args: argparse.Namespace, i: int) -> None:
+    n_png = args.moodboards - args.gif_moodboards
+    moodboards = [f"{mock}/moodboard/{(i + k) % 4}.{'png' if k < n_png else 'gif'}" for k in range(args.moodboards)]
+    if scenario == "bundle":
+        r = await c.post(f"{api}/run-full-to-slack", json={"username": f"bench{i}", "moodboards": moodboards})
+        r.raise_for_status()
+        if not r.json().get("success"):
+            raise RuntimeError(r.json())
+    elif scenario == "video":
+        r = await c.post(f"{api}/video-from-stills", json={"username": f"bench{i}", "stills": moodboards[:1]})
+        r.raise_for_status()
+        if not r.json().get("success"):
+            raise RuntimeError(r.json())
+    elif scenario == "still":
+        r = await c.post(f"{api}/still", json={"username": f"bench{i}", "moodboard_url": moodboards[-1]})
+        r.raise_for_status()
+        if not r.json().get("success"):
+            raise RuntimeError(r.json())
+    else:
+        r = await c.post(f"{api}/character/build", json={"username": f"bench{i}", "count": args.variants})
+        r.raise_for_status()
+        job_id = r.json()["job_id"]
+        while True:
+            await asyncio.sleep(0.25)
+            j = (await c.get(f"{api}/character/build-status", params={"job_id": job_id})).json()
+            if j.get("status") == "completed":
+                return
+            if j.get("status") == "failed":
+                raise RuntimeError(j.get("error"))
+
+
+async def _drive(api: str, mock: str, scenario: str, args: argparse.Namespace, pid: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    sampler = _Sampler(pid)
+    sampler.start()
+
+    async def _worker(c: httpx.AsyncClient) -> None:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                await _one(c, api, mock, scenario, args, i)
+                latencies.append(time.perf_counter() - t0)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}"[:200])
+
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(timeout=httpx.Timeout(args.timeout), limits=httpx.Limits(max_connections=args.concurrency * 2)) as c:
+        await asyncio.gather(*[_worker(c) for _ in range(args.concurrency)])
+    wall = time.perf_counter() - t0
+    sampler.stop()
+    pct = lambda q: round(_percentile(latencies, q) * 1000, 1) if latencies else None
+    return {
+        "scenario": scenario,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "ok": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else None,
+        "wall_s": round(wall, 2),
+        "peak_rss_mb": round(sampler.peak_rss_kb / 1024, 1),
+        "peak_threads": sampler.peak_threads,
+    }
+
+
+def _mock_config(args: argparse.Namespace) -> Dict[str, Any]:
+    w, h = (int(x) for x in args.image_px.lower().split("x"))
+    return {
+        "latency": {"default": {"median_ms": args.latency_ms, "p95_ms": args.p95_ms or args.latency_ms}},
+        # Moodboards stand in for caller-supplied inputs, not a provider
+        "failure_rate": {"default": args.failure_rate, "moodboard": 0.0},
+        "image_px": [w, h],
+        "video_bytes": int(args.video_mb * 1024 * 1024),
+        "job": {"median_ms": args.job_s * 1000, "p95_ms": args.job_s * 2000},
+    }
+
+
+async def _main(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    workdir = tempfile.mkdtemp(prefix="influencer_bench_")
+    mock_port, api_port = _free_port(), _free_port()
+    mock, api = f"http://127.0.0.1:{mock_port}", f"http://127.0.0.1:{api_port}"
+    repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+    base_env = {**os.environ, "PYTHONPATH": repo_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    api_env = {
+        **base_env,
+        "FLUX_API_BASE": mock, "FLUX_PRO_API_KEY": "bench",
+        "UPSCALER_API_BASE": mock, "UPSCALER_API_KEY": "bench",
+        "GEMINI_API_BASE": mock, "GEMINI_API_KEY": "bench",
+        "HIGGSFIELD_PLATFORM_API_BASE": mock, "HIGGSFIELD_API_KEY": "bench", "HIGGSFIELD_API_SECRET": "bench",
+        "SUPABASE_URL": mock, "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "RESULT_CACHE_ENABLED": "true" if args.cache else "false",
+        "RESULT_CACHE_DIR": os.path.join(workdir, "cache"),
+        "IDENTITY_REGISTRY_ENABLED": "true" if args.cache else "false",
+        "IDENTITY_REGISTRY_PATH": os.path.join(workdir, "identities.sqlite3"),
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+    }
+    for kv in args.api_env:
+        k, _, v = kv.partition("=")
+        api_env[k] = v
+    for k in ("SLACK_BOT_TOKEN", "OPENAI_API_KEY"):
+        api_env.pop(k, None)  # never post to real Slack or call OpenAI from a benchmark
+
+    mock_proc = _start("apps.influencer_api.bench.mock_providers:app", mock_port, {**base_env, "BENCH_MOCK_CONFIG": json.dumps(_mock_config(args))}, os.path.join(workdir, "mock.log"))
+    api_proc = _start("apps.influencer_api.main:app", api_port, api_env, os.path.join(workdir, "api.log"))
+    try:
+        await _wait_healthy(mock, mock_proc)
+        await _wait_healthy(api, api_proc)
+        scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+        results = []
+        for sc in scenarios:
+            res = await _drive(api, mock, sc, args, api_proc.pid)
+            results.append(res)
+            print(json.dumps(res), flush=True)
+        return results
+    finally:
+        for p in (api_proc, mock_proc):
+            p.terminate()
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        print(f"logs: {workdir}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--requests", type=int, default=12, help="requests per scenario")
+    ap.add_argument("--moodboards", type=int, default=3, help="moodboards per bundle")
+    ap.add_argument("--gif-moodboards", type=int, default=1, help="how many of those are served as GIF")
+    ap.add_argument("--variants", type=int, default=8, help="variants per character build")
+    ap.add_argument("--latency-ms", type=float, default=200, help="median provider latency")
+    ap.add_argument("--p95-ms", type=float, default=None, help="p95 provider latency (default: same as median)")
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="fraction of provider calls that return 503")
+    ap.add_argument("--image-px", default="768x1024", help="WxH of generated images")
+    ap.add_argument("--video-mb", type=float, default=2.0, help="size of each Higgsfield video")
+    ap.add_argument("--job-s", type=float, default=3.0, help="median Higgsfield queue time")
+    ap.add_argument("--timeout", type=float, default=900, help="per-request client timeout")
+    ap.add_argument("--cache", action="store_true", help="leave the result cache and identity registry on")
+    ap.add_argument("--api-env", action="append", default=[], metavar="KEY=VALUE", help="extra env for the API process")
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args(argv)
+    results = asyncio.run(_main(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
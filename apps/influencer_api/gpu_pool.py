@@ -0,0 +1,179 @@
+"""Pool of GPU API backends with least-loaded routing (INFERENCE_PROVIDER=gpu).
+
+Each request goes to the healthy backend with the lowest expected wait:
+(requests in flight + 1) x its recent latency for that endpoint (an EWMA; a
+backend with no history is assumed as fast as the fastest known one, so new
+boxes get traffic straight away). A request that can't connect is retried on
+the next backend, since it never reached the first.
+
+A background loop probes every backend's health endpoint. After
+GPU_UNHEALTHY_AFTER consecutive failed probes or requests a backend is
+drained -- it gets no new requests, in-flight ones finish -- until a probe
+succeeds again. Backends can also be drained by hand (POST /gpu-pool/drain)
+before taking a box out of service.
+
+The scheduler's gpu in-flight cap is for the whole pool; raise
+SCHED_GPU_MAX_INFLIGHT as backends are added.
+
+Env:
+  GPU_API_BASES           comma-separated backend base URLs (GPU_API_BASE still works for one)
+  GPU_HEALTH_PATH         probe path (default /health)
+  GPU_HEALTH_INTERVAL_S   seconds between probes (default 10)
+  GPU_UNHEALTHY_AFTER     consecutive failures before draining (default 2)
+"""
+import asyncio, os, random, time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from . import http_pool, metrics
+from ._env import env_float
+
+_EWMA_ALPHA = 0.3
+
+
+class NoBackend(RuntimeError):
+    pass
+
+
+class Backend:
+    def __init__(self, base: str):
+        self.base = base.rstrip("/")
+        self.inflight = 0
+        self.latency: Dict[str, float] = {}  # path -> EWMA seconds
+        self.failures = 0
+        self.healthy = True
+        self.drained = False  # by hand; health checks don't undo it
+        self.requests = 0
+        self.errors = 0
+        self.last_probe: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.drained
+
+    def _set_inflight(self, delta: int) -> None:
+        self.inflight += delta
+        metrics.gauge_add("influencer_gpu_backend_inflight", delta, help_text="Requests in flight per GPU backend", backend=self.base)
+
+    def observe(self, path: str, seconds: float) -> None:
+        prev = self.latency.get(path)
+        self.latency[path] = seconds if prev is None else prev + _EWMA_ALPHA * (seconds - prev)
+
+    def fail(self, threshold: int) -> None:
+        self.failures += 1
+        if self.healthy and self.failures >= threshold:
+            self.healthy = False
+            metrics.inc("influencer_gpu_backend_drains_total", help_text="Times a GPU backend was drained as unhealthy", backend=self.base)
+
+    def ok(self) -> None:
+        self.failures = 0
+        self.healthy = True
+
+
+class GpuPool:
+    def __init__(self, bases: List[str], *, health_path: str, health_interval_s: float, unhealthy_after: int):
+        self.backends = [Backend(b) for b in bases]
+        self.health_path = health_path
+        self.health_interval_s = health_interval_s
+        self.unhealthy_after = max(1, unhealthy_after)
+
+    def _pick(self, path: str, exclude: List[Backend]) -> Backend:
+        candidates = [b for b in self.backends if b.available and b not in exclude]
+        if not candidates:
+            raise NoBackend("no healthy GPU backend available")
+        known = [b.latency[path] for b in candidates if path in b.latency]
+        default = min(known) if known else 1.0
+        score = lambda b: (b.inflight + 1) * b.latency.get(path, default)
+        best = min(score(b) for b in candidates)
+        return random.choice([b for b in candidates if score(b) == best])
+
+    async def post(self, path: str, *, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+        """POST `path` to the least-loaded healthy backend."""
+        tried: List[Backend] = []
+        while True:
+            b = self._pick(path, tried)
+            tried.append(b)
+            b._set_inflight(1)
+            b.requests += 1
+            t0 = time.perf_counter()
+            try:
+                r = await http_pool.request("gpu", "POST", b.base + path, timeout=timeout, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # Never reached this box: count it against the backend and try another
+                b.errors += 1
+                b.fail(self.unhealthy_after)
+                if len(tried) >= len(self.backends):
+                    raise
+                continue
+            except httpx.HTTPError:
+                b.errors += 1
+                b.fail(self.unhealthy_after)
+                raise
+            finally:
+                b._set_inflight(-1)
+            if r.status_code >= 500:
+                b.errors += 1
+                b.fail(self.unhealthy_after)
+            else:
+                b.ok()
+                b.observe(path, time.perf_counter() - t0)
+            return r
+
+    async def _probe(self, b: Backend) -> None:
+        b.last_probe = time.time()
+        try:
+            # Through the unscheduled fetch client, so a probe never queues behind long GPU jobs
+            r = await http_pool.request("fetch", "GET", b.base + self.health_path, timeout=min(10.0, self.health_interval_s))
+            healthy = r.status_code < 400
+        except httpx.HTTPError:
+            healthy = False
+        if healthy:
+            b.ok()
+        else:
+            b.fail(self.unhealthy_after)
+
+    async def health_loop(self) -> None:
+        while True:
+            await asyncio.gather(*[self._probe(b) for b in self.backends], return_exceptions=True)
+            await asyncio.sleep(self.health_interval_s)
+
+    def drain(self, base: str, drained: bool = True) -> bool:
+        for b in self.backends:
+            if b.base == base.rstrip("/"):
+                b.drained = drained
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": [
+                {
+                    "base": b.base,
+                    "available": b.available,
+                    "healthy": b.healthy,
+                    "drained": b.drained,
+                    "inflight": b.inflight,
+                    "latency_ms": {p: round(v * 1000, 1) for p, v in b.latency.items()},
+                    "consecutive_failures": b.failures,
+                    "requests": b.requests,
+                    "errors": b.errors,
+                    "last_probe": b.last_probe,
+                }
+                for b in self.backends
+            ],
+            "at": time.time(),
+        }
+
+
+def from_env() -> Optional[GpuPool]:
+    raw = os.getenv("GPU_API_BASES") or os.getenv("GPU_API_BASE") or ""
+    bases = list(dict.fromkeys(b.strip() for b in raw.split(",") if b.strip()))
+    if not bases:
+        return None
+    return GpuPool(
+        bases,
+        health_path=os.getenv("GPU_HEALTH_PATH") or "/health",
+        health_interval_s=max(1.0, env_float("GPU_HEALTH_INTERVAL_S", 10)),
+        unhealthy_after=int(env_float("GPU_UNHEALTHY_AFTER", 2)),
+    )
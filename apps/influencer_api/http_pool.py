@@ -0,0 +1,160 @@
+"""Shared keep-alive async HTTP clients for every outbound provider call.
+
+One httpx.AsyncClient per provider, each with its own connection pool, timeout
+and keep-alive policy. Connections are reused across requests, so a Higgsfield
+poll or Supabase upload no longer pays a fresh TCP+TLS handshake, and waiting
+on a slow provider never holds a thread.
+
+Env overrides (per provider, upper-cased name):
+  HTTP_<PROVIDER>_TIMEOUT      read timeout in seconds
+  HTTP_<PROVIDER>_POOL_SIZE    max connections held by that provider's pool
+  HTTP_KEEPALIVE_EXPIRY        idle seconds before a pooled connection is dropped
+  HTTP2_ENABLED=true           negotiate HTTP/2 where the server supports it (needs `h2`)
+
+Requests to rate-limited providers wait for admission first (see scheduler.py).
+"""
+import contextlib, os, threading, time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from . import metrics, scheduler
+from ._env import env_float
+
+# provider -> (default timeout seconds, default pool size)
+PROVIDERS: Dict[str, tuple] = {
+    "flux": (300, 32),
+    "upscaler": (300, 32),
+    "gemini": (300, 32),
+    "higgsfield": (300, 32),
+    "supabase": (120, 16),
+    "gpu": (600, 32),
+    "fetch": (120, 64),  # hosted image/video downloads (any host)
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    if (os.getenv("HTTP2_ENABLED") or "").lower() != "true":
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _provider_config(provider: str) -> Dict[str, Any]:
+    timeout, pool = PROVIDERS.get(provider, PROVIDERS["fetch"])
+    key = provider.upper()
+    return {
+        "timeout": env_float(f"HTTP_{key}_TIMEOUT", timeout),
+        "pool": max(1, int(env_float(f"HTTP_{key}_POOL_SIZE", pool))),
+        "keepalive": env_float("HTTP_KEEPALIVE_EXPIRY", 60),
+    }
+
+
+def client(provider: str) -> httpx.AsyncClient:
+    """Return the shared client for a provider, creating it on first use."""
+    c = _clients.get(provider)
+    if c is not None:
+        return c
+    with _lock:
+        c = _clients.get(provider)
+        if c is None:
+            cfg = _provider_config(provider)
+            c = httpx.AsyncClient(
+                # pool=None: when every connection is busy, queue for one instead of failing
+                timeout=httpx.Timeout(cfg["timeout"], connect=min(30.0, cfg["timeout"]), pool=None),
+                limits=httpx.Limits(
+                    max_connections=cfg["pool"],
+                    max_keepalive_connections=cfg["pool"],
+                    keepalive_expiry=cfg["keepalive"],
+                ),
+                http2=_http2_enabled(),
+                follow_redirects=True,
+            )
+            _clients[provider] = c
+            _stats[provider] = {"requests": 0, "errors": 0, "connections_opened": 0}
+    return c
+
+
+def _bump(provider: str, field: str) -> None:
+    with _lock:
+        _stats[provider][field] += 1
+
+
+def _tracer(provider: str):
+    async def trace(event: str, info: Dict[str, Any]) -> None:
+        # Fires only when httpcore has to dial a new socket; reused connections skip it
+        if event == "connection.connect_tcp.complete":
+            _bump(provider, "connections_opened")
+    return trace
+
+
+async def request(provider: str, method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+    """Send a request through the provider's pooled client."""
+    c = client(provider)
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    kwargs.setdefault("extensions", {})["trace"] = _tracer(provider)
+    async with scheduler.slot(provider):
+        _bump(provider, "requests")
+        try:
+            r = await c.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            _bump(provider, "errors")
+            raise
+    metrics.add_bytes(provider, "out", int(r.request.headers.get("content-length") or 0))
+    metrics.add_bytes(provider, "in", len(r.content))
+    return r
+
+
+@contextlib.asynccontextmanager
+async def stream(provider: str, method: str, url: str, *, timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    """Async context manager for a streamed response through the provider's pooled client."""
+    c = client(provider)
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    kwargs.setdefault("extensions", {})["trace"] = _tracer(provider)
+    async with scheduler.slot(provider):
+        _bump(provider, "requests")
+        async with c.stream(method, url, **kwargs) as r:
+            try:
+                yield r
+            finally:
+                metrics.add_bytes(provider, "in", r.num_bytes_downloaded)
+
+
+def stats() -> Dict[str, Any]:
+    """Per-provider request counts, connection reuse and live pool occupancy."""
+    out: Dict[str, Any] = {}
+    with _lock:
+        snapshot = {k: dict(v) for k, v in _stats.items()}
+    for provider, s in snapshot.items():
+        transport = getattr(_clients.get(provider), "_transport", None)
+        conns = getattr(getattr(transport, "_pool", None), "connections", None) or []
+        cfg = _provider_config(provider)
+        opened = s["connections_opened"]
+        out[provider] = {
+            **s,
+            "reused": max(0, s["requests"] - opened),
+            "reuse_ratio": round(1 - opened / s["requests"], 3) if s["requests"] else None,
+            "pool_size": cfg["pool"],
+            "timeout_s": cfg["timeout"],
+            "open_connections": len(conns),
+            "idle_connections": sum(1 for cn in conns if cn.is_idle()),
+            "http2": _http2_enabled(),
+        }
+    return {"providers": out, "at": time.time()}
+
+
+async def close_all() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        await c.aclose()
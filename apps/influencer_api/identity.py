@@ -0,0 +1,114 @@
+"""Identity registry: one stable character per username and persona.
+
+Everything is identity-locked around a single character, so its identity
+prompt (the OpenAI round trip), FLUX base image and upscaled base are
+generated once and reused by bundles, stills and character builds. Entries
+are keyed by username plus a hash of the persona; registering a new persona
+for a username retires the old entries, and `invalidate()` drops them
+explicitly. Images live in the artifact store; the registry holds their ids
+and hands back the ids that are no longer referenced so the caller can delete
+them.
+
+Env:
+  IDENTITY_REGISTRY_ENABLED   "false" regenerates the identity on every call (default on)
+  IDENTITY_REGISTRY_PATH      database file (default <tmp>/influencer_identities.sqlite3)
+"""
+import hashlib, json, os, sqlite3, tempfile, threading, time
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+    username TEXT NOT NULL,
+    persona_hash TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    base_artifact TEXT NOT NULL,
+    upscaled_artifact TEXT,
+    created_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (username, persona_hash)
+);
+"""
+
+
+def persona_hash(persona: Optional[Dict[str, Any]]) -> str:
+    """Stable digest of a persona (None and {} are the default persona)."""
+    doc = {k: v for k, v in (persona or {}).items() if v not in (None, "", [])}
+    return hashlib.sha256(json.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def _artifact_ids(rows: List[sqlite3.Row]) -> List[str]:
+    return [a for r in rows for a in (r["base_artifact"], r["upscaled_artifact"]) if a]
+
+
+class IdentityRegistry:
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.row_factory = sqlite3.Row
+            self._local.conn = c
+        return c
+
+    def get(self, username: str, p_hash: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        c = self._conn()
+        row = c.execute("SELECT * FROM identities WHERE username = ? AND persona_hash = ?", (username, p_hash)).fetchone()
+        if row is None:
+            return None
+        c.execute("UPDATE identities SET used_at = ? WHERE username = ? AND persona_hash = ?", (time.time(), username, p_hash))
+        return dict(row)
+
+    def put(self, username: str, p_hash: str, prompt: str, base_artifact: str, upscaled_artifact: Optional[str]) -> List[str]:
+        """Register the identity for this persona, retiring the username's other entries; returns artifact ids to delete."""
+        if not self.enabled:
+            return [a for a in (base_artifact, upscaled_artifact) if a]
+        c = self._conn()
+        now = time.time()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            old = c.execute("SELECT base_artifact, upscaled_artifact FROM identities WHERE username = ?", (username,)).fetchall()
+            c.execute("DELETE FROM identities WHERE username = ?", (username,))
+            c.execute(
+                "INSERT INTO identities (username, persona_hash, prompt, base_artifact, upscaled_artifact, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (username, p_hash, prompt, base_artifact, upscaled_artifact, now, now),
+            )
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        keep = {base_artifact, upscaled_artifact}
+        return [a for a in _artifact_ids(old) if a not in keep]
+
+    def invalidate(self, username: str, p_hash: Optional[str] = None) -> List[str]:
+        """Drop a username's entries (or just one persona's); returns artifact ids to delete."""
+        c = self._conn()
+        where, args = ("username = ? AND persona_hash = ?", (username, p_hash)) if p_hash else ("username = ?", (username,))
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            rows = c.execute(f"SELECT base_artifact, upscaled_artifact FROM identities WHERE {where}", args).fetchall()
+            c.execute(f"DELETE FROM identities WHERE {where}", args)
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        return _artifact_ids(rows)
+
+    def entries(self, username: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT * FROM identities WHERE username = ? ORDER BY used_at DESC", (username,)).fetchall()
+        return [dict(r) for r in rows]
+
+
+def from_env() -> IdentityRegistry:
+    return IdentityRegistry(
+        path=os.getenv("IDENTITY_REGISTRY_PATH") or os.path.join(tempfile.gettempdir(), "influencer_identities.sqlite3"),
+        enabled=(os.getenv("IDENTITY_REGISTRY_ENABLED", "true").lower() != "false"),
+    )
@@ -0,0 +1,160 @@
+"""Loads image sources (moodboards, stills) concurrently, with an in-process cache.
+
+A source is one of our artifact URLs (read from disk), an http(s) URL, a data
+URL or raw base64. `load_all()` loads a list in parallel (bounded) and loads
+each distinct source once, however often it repeats.
+
+Fetched URLs are kept in a size-bounded LRU of ImageRef handles, so whatever
+a handle has already computed -- decoded pixels, data URLs -- is reused by the
+next request too. An entry is served without a request while fresh; after
+that it is revalidated with If-None-Match / If-Modified-Since, and a 304 keeps
+the cached handle. Responses marked no-store aren't cached, and a shorter
+max-age shortens freshness. Concurrent fetches of one URL share a single
+request.
+
+Env:
+  IMAGE_CACHE_MAX_MB        memory bound for cached images, 0 disables the cache (default 256)
+  IMAGE_CACHE_FRESH_S       seconds an entry is served before revalidating (default 60)
+  IMAGE_FETCH_CONCURRENCY   parallel loads per load_all() call (default 8)
+"""
+import asyncio, base64, collections, re, time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from . import http_pool, metrics
+from .imaging import ImageRef
+from ._env import env_float
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class _Entry:
+    __slots__ = ("ref", "etag", "last_modified", "expires")
+
+    def __init__(self, ref: ImageRef, etag: Optional[str], last_modified: Optional[str], expires: float):
+        self.ref = ref
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+
+class ImageLoader:
+    def __init__(self, *, max_bytes: int, fresh_s: float, concurrency: int, locate: Optional[Callable[[str], Optional[str]]] = None):
+        self.max_bytes = max_bytes
+        self.fresh_s = fresh_s
+        self.concurrency = max(1, concurrency)
+        self.locate = locate or (lambda src: None)  # local file for one of our own URLs, if any
+        self._entries: "collections.OrderedDict[str, _Entry]" = collections.OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+
+    def _count(self, result: str) -> None:
+        self._stats[result] += 1
+        metrics.inc("influencer_image_cache_total", help_text="Image source loads by cache outcome", result=result)
+
+    def _freshness(self, r: httpx.Response) -> float:
+        cc = (r.headers.get("cache-control") or "").lower()
+        if "no-cache" in cc:
+            return 0.0
+        m = _MAX_AGE_RE.search(cc)
+        return min(self.fresh_s, float(m.group(1))) if m else self.fresh_s
+
+    def _store(self, url: str, entry: _Entry) -> None:
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        total = sum(e.ref.footprint() for e in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.ref.footprint()
+            self._stats["evictions"] += 1
+
+    async def _refresh(self, url: str, entry: Optional[_Entry]) -> ImageRef:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        r = await http_pool.request("fetch", "GET", url, headers=headers)
+        if r.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            entry.expires = time.monotonic() + self._freshness(r)
+            self._entries.move_to_end(url)
+            return entry.ref
+        r.raise_for_status()
+        self._count("misses")
+        ref = ImageRef.from_bytes(r.content, url=url)
+        if self.max_bytes > 0 and "no-store" not in (r.headers.get("cache-control") or "").lower():
+            self._store(url, _Entry(ref, r.headers.get("etag"), r.headers.get("last-modified"), time.monotonic() + self._freshness(r)))
+        return ref
+
+    async def fetch(self, url: str) -> ImageRef:
+        """An http(s) image, from the cache when fresh or still valid."""
+        entry = self._entries.get(url)
+        if entry is not None and time.monotonic() < entry.expires:
+            self._count("hits")
+            self._entries.move_to_end(url)
+            return entry.ref
+        task = self._inflight.get(url)
+        if task is None:
+            # Its own task, so one caller being cancelled doesn't fail the others sharing it
+            task = asyncio.ensure_future(self._refresh(url, entry))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def load(self, src: str) -> ImageRef:
+        p = self.locate(src)
+        if p:
+            # No url: the address the client used (e.g. the dashboard's origin) may not be reachable by providers
+            return await asyncio.to_thread(lambda: ImageRef.from_bytes(_read_file(p)))  # may decode (BMP, TIFF, ...)
+        if src.startswith("http"):
+            return await self.fetch(src)
+        if src.startswith("data:image"):
+            return ImageRef.from_data_url(src)
+        # assume raw base64
+        try:
+            return ImageRef.from_bytes(base64.b64decode(src))
+        except Exception:
+            raise RuntimeError("Unsupported image input format")
+
+    async def load_all(self, srcs: List[str]) -> List[ImageRef]:
+        """Load every source concurrently (identical sources once), in input order."""
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _one(src: str) -> ImageRef:
+            async with sem:
+                return await self.load(src)
+
+        unique = list(dict.fromkeys(srcs))
+        tasks = [asyncio.ensure_future(_one(s)) for s in unique]
+        try:
+            refs = dict(zip(unique, await asyncio.gather(*tasks)))
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            raise
+        return [refs[s] for s in srcs]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "bytes": sum(e.ref.footprint() for e in self._entries.values()),
+            "max_bytes": self.max_bytes,
+        }
+
+
+def from_env(locate: Optional[Callable[[str], Optional[str]]] = None) -> ImageLoader:
+    return ImageLoader(
+        max_bytes=int(env_float("IMAGE_CACHE_MAX_MB", 256) * 1024 * 1024),
+        fresh_s=env_float("IMAGE_CACHE_FRESH_S", 60),
+        concurrency=int(env_float("IMAGE_FETCH_CONCURRENCY", 8)),
+        locate=locate,
+    )
@@ -0,0 +1,177 @@
+"""ImageRef: an image handle that avoids redundant decode/encode round trips.
+
+Provider responses are kept as the encoded bytes they arrived in (plus the
+hosted URL, if any). Pixels are decoded only when something actually needs
+them (e.g. local video assembly), and every derived encoding (PNG, JPEG, WebP,
+data URL) is computed at most once per handle. Forwarding an image to another
+provider, Slack or Supabase reuses the original bytes untouched.
+
+When an encode is unavoidable (the handle was built from pixels, or a caller
+asks for a different format), the fast encoder settings apply:
+  IMAGE_ENCODE_FORMAT   png | jpeg | webp (default png)
+  PNG_COMPRESS_LEVEL    0-9 (default 1; PIL's default of 6 is several times slower)
+  JPEG_QUALITY          default 92
+  WEBP_QUALITY          default 90
+  IMAGE_FORWARD_URLS    "false" inlines every image as a data URL; by default an
+                        image fetched from an http(s) URL is passed on by that URL
+"""
+import base64, hashlib, io, os, threading
+from typing import Dict, Optional
+
+from PIL import Image
+
+from . import metrics
+from ._env import env_int
+
+_MIME_EXT = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp"}
+_FMT_MIME = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """MIME type of bytes that can pass through as-is (what providers and the artifact store accept), else None."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def encoder_format() -> str:
+    fmt = (os.getenv("IMAGE_ENCODE_FORMAT") or "png").upper()
+    return "JPEG" if fmt == "JPG" else fmt if fmt in _FMT_MIME else "PNG"
+
+
+def _save_kwargs(fmt: str) -> Dict[str, int]:
+    if fmt == "PNG":
+        return {"compress_level": env_int("PNG_COMPRESS_LEVEL", 1)}
+    if fmt == "JPEG":
+        return {"quality": env_int("JPEG_QUALITY", 92)}
+    if fmt == "WEBP":
+        return {"quality": env_int("WEBP_QUALITY", 90)}
+    return {}
+
+
+class ImageRef:
+    def __init__(self, *, data: Optional[bytes] = None, url: Optional[str] = None, image: Optional[Image.Image] = None):
+        if data is None and image is None:
+            raise ValueError("ImageRef needs encoded bytes or pixels")
+        if data is not None and sniff_mime(data) is None:
+            # Not a format we pass through (GIF, BMP, TIFF, ...): decode it now, like any
+            # input PIL can open, and encode on demand like a pixel-only handle
+            try:
+                with metrics.stage("image_decode"):
+                    image = Image.open(io.BytesIO(data)).convert("RGB")
+            except Exception:
+                raise RuntimeError("Unsupported image input format")
+            data = url = None  # providers get the re-encoded pixels, never the original file
+        self._data = data
+        self._mime = sniff_mime(data) if data is not None else None
+        self.url = url  # where the original bytes were fetched from, if hosted
+        self._image = image
+        self._encoded: Dict[str, bytes] = {}
+        self._data_urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, url: Optional[str] = None) -> "ImageRef":
+        return cls(data=data, url=url)
+
+    @classmethod
+    def from_data_url(cls, src: str) -> "ImageRef":
+        return cls(data=base64.b64decode(src.split(",", 1)[1]))
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> "ImageRef":
+        return cls(image=image)
+
+    @property
+    def mime(self) -> str:
+        return self._mime or _FMT_MIME[encoder_format()]
+
+    @property
+    def ext(self) -> str:
+        return _MIME_EXT.get(self.mime, "png")
+
+    def bytes(self) -> bytes:
+        """The original encoded bytes; pixel-only handles are encoded once with the fast encoder."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    fmt = encoder_format()
+                    self._data = self._encode(fmt)
+                    self._mime = _FMT_MIME[fmt]
+        return self._data
+
+    def pil(self) -> Image.Image:
+        """Decoded RGB pixels (decoded on first call, then reused)."""
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    self._image = self.decode()
+        return self._image
+
+    def decode(self, max_side: Optional[int] = None) -> Image.Image:
+        """A fresh RGB copy, optionally shrunk to fit `max_side`; not cached on the handle."""
+        if self._image is not None:
+            img = self._image.convert("RGB")
+        else:
+            with metrics.stage("image_decode"):
+                img = Image.open(io.BytesIO(self._data))
+                if max_side:
+                    img.draft("RGB", (max_side, max_side))  # JPEG decodes straight at a reduced scale
+                img = img.convert("RGB")
+        if max_side and max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        return img
+
+    def _encode(self, fmt: str) -> bytes:
+        img = self.pil()
+        if fmt == "JPEG" and img.mode != "RGB":
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        with metrics.stage("image_encode"):
+            img.save(buf, format=fmt, **_save_kwargs(fmt))
+        return buf.getvalue()
+
+    def encoded(self, fmt: str) -> bytes:
+        """Bytes in a specific format (PNG/JPEG/WEBP); the original passes through when it already matches."""
+        fmt = "JPEG" if fmt.upper() == "JPG" else fmt.upper()
+        if self._data is not None and self._mime == _FMT_MIME.get(fmt):
+            return self._data
+        if fmt not in self._encoded:
+            data = self._encode(fmt)
+            with self._lock:
+                self._encoded.setdefault(fmt, data)
+        return self._encoded[fmt]
+
+    def data_url(self, fmt: Optional[str] = None) -> str:
+        """data: URL of the original bytes (or of a specific format), built once."""
+        key = (fmt or "").upper()
+        if key not in self._data_urls:
+            if fmt:
+                data, mime = self.encoded(fmt), _FMT_MIME["JPEG" if key == "JPG" else key]
+            else:
+                data, mime = self.bytes(), self.mime
+            url = f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+            with self._lock:
+                self._data_urls.setdefault(key, url)
+        return self._data_urls[key]
+
+    def payload_url(self) -> str:
+        """What to hand the next provider: the URL it was fetched from, else a data URL."""
+        if self.url and self.url.startswith(("http://", "https://")) and (os.getenv("IMAGE_FORWARD_URLS") or "").lower() != "false":
+            return self.url
+        return self.data_url()
+
+    def sha256(self) -> str:
+        return hashlib.sha256(self.bytes()).hexdigest()
+
+    def footprint(self) -> int:
+        """Approximate memory held: encoded bytes, derived encodings and data URLs, decoded pixels."""
+        with self._lock:
+            n = len(self._data or b"") + sum(map(len, self._encoded.values())) + sum(map(len, self._data_urls.values()))
+            if self._image is not None:
+                n += self._image.width * self._image.height * len(self._image.getbands())
+        return n
@@ -0,0 +1,227 @@
+"""SQLite-backed job store shared by every uvicorn worker on the host.
+
+Rows hold job metadata only; generated images and videos live in the artifact
+store (or Supabase) and are referenced by URL. Items published by a running job
+(e.g. character variants) go in their own table with a global sequence number,
+so readers can ask for "everything after seq N". Resumable jobs (bundle runs)
+record finished stage outputs under data["checkpoints"].
+
+Background jobs (bundle runs, character builds) have one owner at a time,
+which refreshes updated_at through `heartbeat()` while it runs. `evict()`
+marks owned jobs whose heartbeat went stale (a crashed worker) as failed, so
+pollers stop waiting and the jobs age out like finished ones. `claim()` hands
+a resumable job to a new owner only once it failed or went stale.
+
+Env:
+  JOB_STORE_PATH       database file (default <tmp>/influencer_jobs.sqlite3)
+  JOB_STORE_TTL_S      drop finished jobs this long after their last update (default 86400)
+  JOB_STORE_MAX_JOBS   keep at most this many jobs, least recently read go first (default 500)
+  JOB_STORE_STALE_S    an unfinished job not updated for this long is abandoned (default 300)
+"""
+import json, os, sqlite3, tempfile, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+from ._env import env_float, env_int
+
+FINISHED = ("completed", "failed")
+_TOUCH_EVERY_S = 60.0  # get() refreshes accessed_at at most this often per job
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    artifact_id TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_items_job ON job_items (job_id, seq);
+CREATE INDEX IF NOT EXISTS jobs_accessed ON jobs (accessed_at);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str, ttl_s: float = 86400.0, max_jobs: int = 500, stale_s: float = 300.0):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_jobs = max_jobs
+        self.stale_s = stale_s
+        self.heartbeat_s = stale_s / 4  # how often owners should call heartbeat()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets other workers read while one writes
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.row_factory = sqlite3.Row
+            self._local.conn = c
+        return c
+
+    def create(self, job_id: str, kind: str, **fields: Any) -> None:
+        now = time.time()
+        data = {"status": "queued", **fields}
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, data, created_at, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, data["status"], json.dumps(data), now, now, now),
+        )
+
+    def put(self, job_id: str, kind: str, **fields: Any) -> None:
+        """Like create(), but replaces the job if the id already exists."""
+        now = time.time()
+        data = {"status": "queued", **fields}
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, data, created_at, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET kind = excluded.kind, status = excluded.status, data = excluded.data, updated_at = excluded.updated_at",
+            (job_id, kind, data["status"], json.dumps(data), now, now, now),
+        )
+
+    def _mutate(self, job_id: str, fn: Callable[[Dict[str, Any]], None]) -> None:
+        c = self._conn()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            row = c.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                c.execute("ROLLBACK")
+                return
+            data = json.loads(row["data"])
+            fn(data)
+            c.execute(
+                "UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?",
+                (data.get("status", "queued"), json.dumps(data), time.time(), job_id),
+            )
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        self._mutate(job_id, lambda data: data.update(fields))
+
+    def checkpoint(self, job_id: str, stage: str, key: str, value: Any, artifact_id: Optional[str] = None) -> None:
+        """Record one finished unit of a stage under data["checkpoints"][stage][key].
+
+        Merged inside the transaction, so concurrent writers never drop each
+        other's entries; `artifact_id` is added to the job's artifacts so it is
+        deleted along with the job.
+        """
+        def _merge(data: Dict[str, Any]) -> None:
+            data.setdefault("checkpoints", {}).setdefault(stage, {})[key] = value
+            if artifact_id:
+                data.setdefault("artifacts", []).append(artifact_id)
+        self._mutate(job_id, _merge)
+
+    def claim(self, job_id: str, owner: str, **fields: Any) -> bool:
+        """Make `owner` the job's runner if it failed or its runner went stale; False if it's still running."""
+        c = self._conn()
+        now = time.time()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            row = c.execute("SELECT status, data, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] == "completed" or (row["status"] != "failed" and row["updated_at"] >= now - self.stale_s):
+                c.execute("ROLLBACK")
+                return False
+            data = json.loads(row["data"])
+            data.update(fields, status="running", owner=owner)
+            c.execute("UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?", ("running", json.dumps(data), now, job_id))
+            c.execute("COMMIT")
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        return True
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        """Refresh a running job's updated_at; False once `owner` no longer holds it."""
+        cur = self._conn().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running' AND json_extract(data, '$.owner') = ?",
+            (time.time(), job_id, owner),
+        )
+        return cur.rowcount == 1
+
+    def add_item(self, job_id: str, idx: int, url: str, artifact_id: Optional[str] = None) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO job_items (job_id, idx, url, artifact_id, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, idx, url, artifact_id, time.time()),
+        )
+        return int(cur.lastrowid)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        c = self._conn()
+        row = c.execute("SELECT data, accessed_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        # LRU order only needs to be roughly right; status pollers and SSE streams read
+        # every fraction of a second and shouldn't each cost a write transaction
+        now = time.time()
+        if now - row["accessed_at"] > _TOUCH_EVERY_S:
+            c.execute("UPDATE jobs SET accessed_at = ? WHERE id = ?", (now, job_id))
+        return json.loads(row["data"])
+
+    def items(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Items published after `after_seq`, in publication order."""
+        rows = self._conn().execute(
+            "SELECT seq, idx, url, artifact_id FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after_seq),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def evict(self) -> List[str]:
+        """Apply TTL and LRU bounds; return artifact ids that are no longer referenced."""
+        c = self._conn()
+        now = time.time()
+        # Abandoned: an owner stopped heartbeating (its worker died). Fail the job so pollers
+        # stop waiting; updated_at is left alone, so the TTL still counts from the last beat
+        c.execute(
+            f"UPDATE jobs SET status = 'failed', data = json_set(data, '$.status', 'failed', '$.error', 'abandoned: its worker stopped') "
+            f"WHERE status NOT IN ({','.join('?' * len(FINISHED))}) AND json_extract(data, '$.owner') IS NOT NULL AND updated_at < ?",
+            (*FINISHED, now - self.stale_s),
+        )
+        done = f"status IN ({','.join('?' * len(FINISHED))})"
+        done_args = FINISHED
+        doomed = [r["id"] for r in c.execute(f"SELECT id FROM jobs WHERE {done} AND updated_at < ?", (*done_args, now - self.ttl_s))]
+        remaining = c.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - len(doomed)
+        if remaining > self.max_jobs:
+            # Live jobs are never evicted; finished ones go least-recently-read first
+            for r in c.execute(f"SELECT id FROM jobs WHERE {done} ORDER BY accessed_at", done_args).fetchall():
+                if remaining <= self.max_jobs:
+                    break
+                if r["id"] not in doomed:
+                    doomed.append(r["id"])
+                    remaining -= 1
+        artifacts: List[str] = []
+        for job_id in doomed:
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                artifacts += [r[0] for r in c.execute("SELECT artifact_id FROM job_items WHERE job_id = ? AND artifact_id IS NOT NULL", (job_id,))]
+                row = c.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is not None:
+                    artifacts += json.loads(row["data"]).get("artifacts") or []
+                c.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                c.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+        return artifacts
+
+
+def from_env() -> JobStore:
+    return JobStore(
+        path=os.getenv("JOB_STORE_PATH") or os.path.join(tempfile.gettempdir(), "influencer_jobs.sqlite3"),
+        ttl_s=env_float("JOB_STORE_TTL_S", 86400),
+        max_jobs=env_int("JOB_STORE_MAX_JOBS", 500),
+        stale_s=env_float("JOB_STORE_STALE_S", 300),
+    )
@@ -1,15 +1,16 @@
-import os, io, base64, tempfile, time, uuid, threading
-from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, Body, status
-from fastapi.responses import ORJSONResponse
+import os, base64, time, uuid, asyncio, contextlib, contextvars, hmac, hashlib, json, weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from . import startup
+from fastapi import FastAPI, Body, Request, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-from PIL import Image
-from moviepy.editor import ImageSequenceClip
-import requests
-from openai import OpenAI
-from openai import OpenAI
+startup.mark("import:fastapi")
+from . import artifacts, gpu_pool, http_pool, identity, image_loader, job_store, metrics, publisher, resilience, result_cache, scheduler, supabase_storage, video_assembly
+from .imaging import ImageRef
+from ._env import env_float, env_int
+startup.mark("import:app_modules")
 
 app = FastAPI(default_response_class=ORJSONResponse)
 
@@ -48,71 +49,118 @@ def _get_env(k: str, required: bool = True) -> Optional[str]:
         raise RuntimeError(f"Missing env: {k}")
     return v
 
-def _fetch_img_to_pil(url: str) -> Image.Image:
-    r = requests.get(url, stream=True, timeout=120)
+# PIL decode/encode and frame blending are CPU-bound; keep them off the event loop
+_cpu_pool = ThreadPoolExecutor(max_workers=max(1, env_int("CPU_WORKERS", min(8, (os.cpu_count() or 2) + 2))), thread_name_prefix="cpu")
+
+async def _cpu(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    # run_in_executor doesn't carry contextvars; copy them so CPU stages land in the request's timeline
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_cpu_pool, partial(ctx.run, fn, *args, **kwargs))
+
+async def _gather(*aws):
+    """asyncio.gather that cancels the siblings when one fails."""
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+
+async def _fetch_image(url: str) -> ImageRef:
+    r = await http_pool.request("fetch", "GET", url)
     r.raise_for_status()
-    return Image.open(r.raw).convert("RGB")
+    return ImageRef.from_bytes(r.content, url=url)
+
+async def _provider_ref(out: str, what: str) -> ImageRef:
+    """Wrap a provider's hosted URL or data URL without decoding it."""
+    if out.startswith("http"):
+        return await _fetch_image(out)
+    if out.startswith("data:image"):
+        return ImageRef.from_data_url(out)
+    raise RuntimeError(f"Unexpected {what} response shape")
+
+_results = result_cache.from_env()
+# Generated images/videos served from /artifacts/<id> instead of inlined into JSON
+_artifacts = artifacts.from_env()
+# Moodboards/stills by URL: our artifacts come straight from disk, remote ones via a revalidating LRU
+_images = image_loader.from_env(locate=lambda src: _artifacts.locate(_artifacts.id_from_url(src) or ""))
 
-def flux_txt2img(prompt: str, width: int = 768, height: int = 1024, *, negative: Optional[str] = None, seed: Optional[str] = None) -> Image.Image:
+async def _digest(img: ImageRef) -> str:
+    """Cache-key stand-in for an input image: its bytes, not the URL it came from (that content can change)."""
+    return "sha256:" + await _cpu(img.sha256)
+
+async def _cached(key: Optional[str], produce: Callable, stage: str) -> ImageRef:
+    """Serve an image result from the on-disk cache, or produce it (timed as `stage`) and store its bytes."""
+    data = await asyncio.to_thread(_results.get, key) if key else None
+    if data is not None:
+        metrics.inc("influencer_result_cache_hits_total", help_text="Provider calls served from the result cache", stage=stage)
+        return ImageRef.from_bytes(data)
+    with metrics.stage(stage):
+        ref = await produce()
+    if key:
+        await asyncio.to_thread(_results.put, key, ref.bytes())
+    return ref
+
+async def flux_txt2img(prompt: str, width: int = 768, height: int = 1024, *, negative: Optional[str] = None, seed: Optional[str] = None, cache: bool = True) -> ImageRef:
     base = _get_env("FLUX_API_BASE")
     key = _get_env("FLUX_PRO_API_KEY")
     url = f"{base.rstrip('/')}/text-to-image"
     payload: Dict[str, Any] = {"prompt": prompt, "width": width, "height": height}
     if negative: payload["negative_prompt"] = negative
     if seed: payload["seed"] = str(seed)
-    r = requests.post(
-        url,
-        headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-        json=payload,
-        timeout=180,
-    )
-    r.raise_for_status()
-    j = r.json()
-    # Accept either direct data URL, base64, or hosted URL
-    if isinstance(j, dict):
-        if j.get("image"):
-            img_field = j["image"]
-            if isinstance(img_field, str) and img_field.startswith("http"):
-                return _fetch_img_to_pil(img_field)
-            if isinstance(img_field, str) and img_field.startswith("data:image"):
-                head, b64 = img_field.split(",", 1)
-                return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
-        if j.get("images"):
-            img_url = j["images"][0]
-            return _fetch_img_to_pil(img_url)
-    raise RuntimeError("Unexpected FLUX response shape")
-
-def upscaler_upscale(img: Image.Image, scale: int = 2) -> Image.Image:
+
+    async def _call() -> ImageRef:
+        r = await http_pool.request(
+            "flux", "POST", url,
+            headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+            json=payload,
+            timeout=180,
+        )
+        r.raise_for_status()
+        j = r.json()
+        # Accept either direct data URL, base64, or hosted URL
+        if isinstance(j, dict):
+            if j.get("image"):
+                img_field = j["image"]
+                if isinstance(img_field, str) and (img_field.startswith("http") or img_field.startswith("data:image")):
+                    return await _provider_ref(img_field, "FLUX")
+            if j.get("images"):
+                return await _provider_ref(j["images"][0], "FLUX")
+        raise RuntimeError("Unexpected FLUX response shape")
+
+    # Only seeded generations are reproducible, so only those are cached
+    ck = result_cache.cache_key("flux", base.rstrip("/") + "/text-to-image", **payload) if cache and seed else None
+    return await _cached(ck, partial(resilience.call, "flux", _call, idempotent=bool(seed)), "flux_txt2img")
+
+async def upscaler_upscale(img: ImageRef, scale: int = 2, *, cache: bool = True) -> ImageRef:
     base = _get_env("UPSCALER_API_BASE")
     key = _get_env("UPSCALER_API_KEY")
-    buf = io.BytesIO(); img.save(buf, format="PNG")
-    payload = {"scale": scale, "image": f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"}
-    r = requests.post(
-        f"{base.rstrip('/')}/upscale",
-        headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-        json=payload,
-        timeout=300,
-    )
-    r.raise_for_status()
-    j = r.json()
-    out = j.get("image") or (j.get("images") or [None])[0]
-    if not out:
-        raise RuntimeError("Upscaler returned no image")
-    if out.startswith("http"):
-        return _fetch_img_to_pil(out)
-    if out.startswith("data:image"):
-        head, b64 = out.split(",", 1)
-        return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
-    raise RuntimeError("Unexpected upscaler response shape")
+    payload = {"scale": scale, "image": await _cpu(img.payload_url)}
 
+    async def _call() -> ImageRef:
+        r = await http_pool.request(
+            "upscaler", "POST", f"{base.rstrip('/')}/upscale",
+            headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+            json=payload,
+        )
+        r.raise_for_status()
+        j = r.json()
+        out = j.get("image") or (j.get("images") or [None])[0]
+        if not out:
+            raise RuntimeError("Upscaler returned no image")
+        return await _provider_ref(out, "upscaler")
 
-def flux_i2i(init_img: Image.Image, prompt: str, strength: float = 0.35, width: int = 768, height: int = 1024, *, negative: Optional[str] = None, seed: Optional[str] = None) -> Image.Image:
+    ck = result_cache.cache_key("upscaler", base.rstrip("/") + "/upscale", **{**payload, "image": await _digest(img)}) if cache else None
+    return await _cached(ck, partial(resilience.call, "upscaler", _call, idempotent=True), "upscale")
+
+
+async def flux_i2i(init_img: ImageRef, prompt: str, strength: float = 0.35, width: int = 768, height: int = 1024, *, negative: Optional[str] = None, seed: Optional[str] = None, cache: bool = True) -> ImageRef:
     base = _get_env("FLUX_API_BASE")
     key = _get_env("FLUX_PRO_API_KEY")
     url = f"{base.rstrip('/')}/image-to-image"
-    buf = io.BytesIO(); init_img.save(buf, format="PNG")
     payload: Dict[str, Any] = {
-        "image": f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}",
+        "image": await _cpu(init_img.payload_url),
         "prompt": prompt,
         "strength": strength,
         "width": width,
@@ -120,52 +168,44 @@ def flux_i2i(init_img: Image.Image, prompt: str, strength: float = 0.35, width:
     }
     if negative: payload["negative_prompt"] = negative
     if seed: payload["seed"] = str(seed)
-    r = requests.post(url, headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"}, json=payload, timeout=300)
-    r.raise_for_status()
-    j = r.json()
-    out = j.get("image") or (j.get("images") or [None])[0]
-    if not out:
-        raise RuntimeError("FLUX i2i returned no image")
-    if out.startswith("http"):
-        return _fetch_img_to_pil(out)
-    if out.startswith("data:image"):
-        head, b64 = out.split(",", 1)
-        return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
-    raise RuntimeError("Unexpected FLUX i2i response shape")
 
-def pil_to_data_url(img: Image.Image, fmt="PNG") -> str:
-    buf = io.BytesIO(); img.save(buf, format=fmt)
-    b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-    return f"data:image/{fmt.lower()};base64,{b64}"
+    async def _call() -> ImageRef:
+        r = await http_pool.request("flux", "POST", url, headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"}, json=payload)
+        r.raise_for_status()
+        j = r.json()
+        out = j.get("image") or (j.get("images") or [None])[0]
+        if not out:
+            raise RuntimeError("FLUX i2i returned no image")
+        return await _provider_ref(out, "FLUX i2i")
 
+    ck = result_cache.cache_key("flux", url, **{**payload, "image": await _digest(init_img)}) if cache and seed else None
+    return await _cached(ck, partial(resilience.call, "flux", _call, idempotent=bool(seed)), "flux_i2i")
 
-def make_video_from_images(images: List[Image.Image], fps: int = 24, seconds: int = 5) -> str:
-    frames = images * max(1, (fps * seconds) // max(1, len(images)))
-    clip = ImageSequenceClip([im for im in map(lambda x: x.convert("RGB"), frames[: fps * seconds])], fps=fps)
-    tmp = tempfile.mkdtemp(prefix="vid_")
-    out = os.path.join(tmp, "out.mp4")
-    clip.write_videofile(out, codec="libx264", audio=False, logger=None, preset="fast")
-    return out
+def make_video_from_images(images: List[ImageRef], fps: int = 24, seconds: int = 5, *, hold_s: Optional[List[float]] = None, crossfade_s: float = 0.0) -> str:
+    """Assemble stills into an MP4 temp artifact (frames streamed to ffmpeg); returns its path."""
+    with metrics.stage("video_assemble"), _artifacts.writer("mp4", temp=True) as (artifact_id, part):
+        video_assembly.assemble(images, part, fps=fps, seconds=seconds, hold_s=hold_s, crossfade_s=crossfade_s)
+    return _artifacts.path(artifact_id, temp=True)
 
 def video_to_data_url(path: str) -> str:
     with open(path, "rb") as f:
         b64 = base64.b64encode(f.read()).decode("utf-8")
     return f"data:video/mp4;base64,{b64}"
 
-def _load_image_from_any(src: str) -> Image.Image:
-    if src.startswith("http"):
-        return _fetch_img_to_pil(src)
-    if src.startswith("data:image"):
-        head, b64 = src.split(",", 1)
-        return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
-    # assume raw base64
-    try:
-        return Image.open(io.BytesIO(base64.b64decode(src))).convert("RGB")
-    except Exception:
-        raise RuntimeError("Unsupported image input format")
+async def _load_image_from_any(src: str) -> ImageRef:
+    return await _images.load(src)
+
 
+def _slack_client():
+    from slack_sdk import WebClient
+    return WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
 
-_slack = WebClient(token=os.getenv("SLACK_BOT_TOKEN")) if os.getenv("SLACK_BOT_TOKEN") else None
+def _openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# SDK clients load on first use (or in the background warm-up), not at import
+_slack = startup.lazy("slack", _slack_client) if os.getenv("SLACK_BOT_TOKEN") else None
 _slack_channel = os.getenv("SLACK_CHANNEL", "#content-bot")
 _higgs_base = os.getenv("HIGGSFIELD_API_BASE")  # legacy/custom API (kept for fallback)
 _higgs_key = os.getenv("HIGGSFIELD_API_KEY")
@@ -175,16 +215,13 @@ _higgs_model = os.getenv("HIGGSFIELD_MODEL", "seedance pro")
 _higgs_motion_id = os.getenv("HIGGSFIELD_MOTION_ID", "cb27169d-aba4-43d9-8667-3292966b2de5")
 _higgs_enhance_prompt = (os.getenv("HIGGSFIELD_ENHANCE_PROMPT", "true").lower() == "true")
 _higgs_seed = os.getenv("HIGGSFIELD_SEED")
-_openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
 _gemini_base = os.getenv("GEMINI_API_BASE")
 _gemini_key = os.getenv("GEMINI_API_KEY")
 _gemini_model = os.getenv("GEMINI_MODEL", "nanobanana")
-_openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+_openai = startup.lazy("openai", _openai_client) if os.getenv("OPENAI_API_KEY") else None
 
 # Supabase storage config
-_sb_url = os.getenv("SUPABASE_URL")
-_sb_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_SERVICE_KEY")
-_sb_bucket = os.getenv("SUPABASE_STORAGE_BUCKET", "influencer")
+_storage = supabase_storage.from_env()
 
 # ---- Prompt templates ----
 IDENTITY_LOCK_NEGATIVE = (
@@ -196,132 +233,546 @@ DEFAULT_SEED = os.getenv("FLUX_SEED")
 
 # Provider selection: "replicate" (default) or "gpu"
 _provider = (os.getenv("INFERENCE_PROVIDER") or "replicate").lower()
-_gpu_base = os.getenv("GPU_API_BASE")
+_gpu = gpu_pool.from_env() if _provider == "gpu" else None
 
 
 @app.get("/health", status_code=status.HTTP_200_OK)
-def health():
+async def health():
     return {"ok": True}
 
 
+@app.get("/http-pool-stats")
+async def http_pool_stats():
+    return {"success": True, **http_pool.stats()}
+
+
+@app.get("/scheduler-stats")
+async def scheduler_stats():
+    return {"success": True, **scheduler.stats()}
+
+
+@app.get("/resilience-stats")
+async def resilience_stats():
+    return {"success": True, **resilience.stats()}
+
+
+@app.get("/gpu-pool-stats")
+async def gpu_pool_stats():
+    if _gpu is None:
+        return {"success": False, "error": "GPU pool not configured"}
+    return {"success": True, **_gpu.stats()}
+
+
+@app.post("/gpu-pool/drain")
+async def gpu_pool_drain(base: str = Body(..., embed=True), drained: bool = Body(True, embed=True)):
+    """Stop (or resume) sending new requests to one GPU backend; in-flight ones finish."""
+    if _gpu is None or not _gpu.drain(base, drained):
+        return {"success": False, "error": "backend not found"}
+    return {"success": True, **_gpu.stats()}
+
+
+@app.get("/startup-stats")
+async def startup_stats():
+    return {"success": True, **startup.report()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return {"success": True, **_results.stats(), "images": _images.stats()}
+
+
+def _byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end); raises ValueError if unsatisfiable."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None  # absent, foreign unit or multi-range: serve the whole file
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), (int(last) if last else size - 1)
+        else:
+            start, end = size - int(last), size - 1  # suffix range: last N bytes
+    except ValueError:
+        return None
+    start, end = max(0, start), min(end, size - 1)
+    if start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def _iter_file(path: str, start: int, length: int, chunk_size: int = 256 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@app.api_route("/artifacts/{artifact_id}", methods=["GET", "HEAD"])
+async def get_artifact(artifact_id: str, request: Request):
+    """Stream an artifact from disk, honouring single-range requests (video seeking, resumed downloads)."""
+    p = _artifacts.locate(artifact_id)
+    if not p:
+        return ORJSONResponse({"success": False, "error": "artifact not found"}, status_code=status.HTTP_404_NOT_FOUND)
+    size = (await asyncio.to_thread(os.stat, p)).st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        # Ids are never reused, so the bytes behind a URL never change
+        "Cache-Control": "public, max-age=86400, immutable",
+        "ETag": f'"{artifact_id}"',
+    }
+    try:
+        rng = _byte_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if rng and request.headers.get("if-range", f'"{artifact_id}"') != f'"{artifact_id}"':
+        rng = None
+    start, end = rng or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    code = status.HTTP_200_OK
+    if rng:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        code = status.HTTP_206_PARTIAL_CONTENT
+    media_type = _artifacts.content_type(artifact_id)
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=code, headers=headers, media_type=media_type)
+    # Sync generator: Starlette iterates it in its threadpool, so reads never block the loop
+    return StreamingResponse(_iter_file(p, start, end - start + 1), status_code=code, headers=headers, media_type=media_type)
+
+
+async def _housekeeping():
+    interval = env_float("JOB_STORE_EVICT_INTERVAL_S", 600)
+    while True:
+        try:
+            for artifact_id in await asyncio.to_thread(_jobs.evict):
+                await asyncio.to_thread(_artifacts.delete, artifact_id)
+            await asyncio.to_thread(_artifacts.reap)
+        except Exception:
+            metrics.swallowed("housekeeping")
+        await asyncio.sleep(interval)
+
+
+def _response_mode(requested: Optional[str]) -> str:
+    """"artifact" returns /artifacts/<id> URLs, "inline" returns data URLs (RESPONSE_MODE sets the default)."""
+    mode = (requested or os.getenv("RESPONSE_MODE") or "artifact").lower()
+    return mode if mode in ("artifact", "inline") else "artifact"
+
+
+async def _image_out(img: ImageRef, mode: str) -> str:
+    if mode == "inline":
+        return await _cpu(img.data_url)
+    data = await _cpu(img.bytes)
+    return _artifacts.url(await asyncio.to_thread(_artifacts.save_bytes, data, img.ext, True))
+
+
+async def _video_out(path: str, mode: str) -> str:
+    """URL for a video already written as a temp artifact."""
+    if mode == "inline":
+        url = await _cpu(video_to_data_url, path)
+        await asyncio.to_thread(_artifacts.delete, os.path.basename(path))
+        return url
+    return _artifacts.url(os.path.basename(path))
+
+
+@app.on_event("startup")
+async def _start_housekeeping():
+    _spawn(_housekeeping())
+    if _gpu is not None:
+        _spawn(_gpu.health_loop())
+    startup.ready()
+    _spawn(startup.warm_up())
+
+
+@app.on_event("shutdown")
+async def _close_http_pools():
+    await http_pool.close_all()
+    _cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
 @app.post("/preview-still")
-def preview_still(persona: Optional[Persona] = Body(None)):
-    if _provider == "gpu" and _gpu_base:
-        r = requests.post(f"{_gpu_base}/preview-still", json={"persona": persona.model_dump() if persona else None}, timeout=300)
+async def preview_still(
+    persona: Optional[Persona] = Body(None),
+    fresh: bool = Body(False, embed=True),
+    response_mode: Optional[str] = Body(None, embed=True),  # "artifact" | "inline"
+):
+    if _gpu is not None:
+        try:
+            r = await _gpu.post("/preview-still", json={"persona": persona.model_dump() if persona else None}, timeout=300)
+        except gpu_pool.NoBackend as e:
+            return {"success": False, "error": str(e)}
         return r.json()
     # FLUX + optional upscaler
-    img = flux_txt2img(persona_to_prompt(persona))
-    if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
+    with resilience.decisions() as dec:
+        img = await flux_txt2img(persona_to_prompt(persona), cache=not fresh)
+        if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
+            try:
+                img = await upscaler_upscale(img, cache=not fresh)
+            except Exception as e:
+                resilience.fallback("upscaler", "skip_upscale", e)
+    return {"success": True, "imageUrl": await _image_out(img, _response_mode(response_mode)), "resilience": dec}
+
+
+BUNDLE_PROMPT = "show this subject wearing the clothes while making outfit/get ready with me content in their bedroom"
+BUNDLE_STAGES = ("stills", "upscales", "videos")
+# Checkpointed outputs of a bundle run, in pipeline order (see /run-full-to-slack/resume)
+BUNDLE_CHECKPOINTS = ("persona", "moodboards", "stills", "upscales", "videos", "publish")
+
+
+def _bundle_limits(overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Per-stage parallelism for bundle runs.
+
+    Request body wins, then BUNDLE_<STAGE>_CONCURRENCY, then BUNDLE_CONCURRENCY (default 3).
+    """
+    limits: Dict[str, int] = {}
+    for stage in BUNDLE_STAGES:
+        v = (overrides or {}).get(stage) or os.getenv(f"BUNDLE_{stage.upper()}_CONCURRENCY") or os.getenv("BUNDLE_CONCURRENCY", "3")
         try:
-            img = upscaler_upscale(img)
-        except Exception:
-            pass
-    return {"success": True, "imageUrl": pil_to_data_url(img)}
+            limits[stage] = max(1, int(v))
+        except (TypeError, ValueError):
+            limits[stage] = 3
+    return limits
+
+
+class _NoImage(Exception):
+    pass
+
+
+async def _gemini_compose(character: ImageRef, moodboard: ImageRef, prompt: str, *, cache: bool = True) -> Optional[ImageRef]:
+    """Compose character + moodboard via Gemini; None when Gemini returns no image."""
+    payload = {"model": _gemini_model, "character": await _cpu(character.payload_url), "moodboard": await _cpu(moodboard.payload_url), "prompt": prompt}
+
+    async def _call() -> ImageRef:
+        rr = await http_pool.request("gemini", "POST", f"{_gemini_base.rstrip('/')}/image-compose", headers={"Authorization": f"Bearer {_gemini_key}", "Content-Type": "application/json"}, json=payload)
+        rr.raise_for_status(); jj = rr.json(); out = jj.get("image") or (jj.get("images") or [None])[0]
+        if not out:
+            raise _NoImage()
+        # A one-off result: hosted/data URLs bypass the moodboard cache
+        return await (_provider_ref(out, "Gemini") if out.startswith(("http", "data:image")) else _load_image_from_any(out))
+
+    ck = result_cache.cache_key(
+        "gemini", _gemini_base.rstrip("/") + "/image-compose",
+        **{**payload, "character": await _digest(character), "moodboard": await _digest(moodboard)},
+    ) if cache else None
+    try:
+        return await _cached(ck, partial(resilience.call, "gemini", _call, idempotent=True), "gemini_compose")
+    except _NoImage:
+        return None
 
 
 @app.post("/run-full-to-slack")
-def run_full_to_slack(
+async def run_full_to_slack(
     username: str = Body(..., embed=True),
     persona: Optional[Persona] = Body(None),
     moodboards: Optional[List[str]] = Body(None),
     outputs: Optional[Dict[str, Any]] = Body(None),
+    concurrency: Optional[Dict[str, int]] = Body(None),
+    fresh: bool = Body(False, embed=True),  # bypass the result cache for a new sample
+    regenerate_identity: bool = Body(False, embed=True),  # replace the username's locked character
 ):
-    # If GPU provider is configured, forward to GPU API (it will generate and upload)
-    if _provider == "gpu" and _gpu_base:
-        r = requests.post(
-            f"{_gpu_base}/run-full-to-slack",
-            json={"username": username, "persona": persona.model_dump() if persona else None},
-            timeout=600,
-        )
-        return r.json()
+    # Per-request breakdown of where the time went, returned with the result
+    with metrics.timeline() as tl, resilience.decisions() as dec, metrics.stage("bundle"), scheduler.priority("batch"):
+        # If GPU provider is configured, forward to GPU API (it will generate and upload)
+        if _gpu is not None:
+            try:
+                r = await _gpu.post("/run-full-to-slack", json={"username": username, "persona": persona.model_dump() if persona else None})
+            except gpu_pool.NoBackend as e:
+                return {"success": False, "error": str(e)}
+            return r.json()
 
-    # Provider API path (FLUX)
-    persona_img = flux_txt2img(persona_to_prompt(persona), negative=IDENTITY_LOCK_NEGATIVE, seed=DEFAULT_SEED)
-    # Moodboards: require provided from pipeline
-    if moodboards and len(moodboards) > 0:
-        mood = [_load_image_from_any(u) for u in moodboards]
-    else:
-        raise RuntimeError("No moodboards provided; UI/server must supply from embeddings pipeline")
-    # Stills: one per moodboard via Gemini (required)
-    if not (_gemini_base and _gemini_key):
-        raise RuntimeError("Gemini not configured: set GEMINI_API_BASE and GEMINI_API_KEY")
-    stills: List[Image.Image] = []
-    for mb in (moodboards or []):
-        payload = {"model": _gemini_model, "character": pil_to_data_url(persona_img), "moodboard": mb, "prompt": "show this subject wearing the clothes while making outfit/get ready with me content in their bedroom"}
-        rr = requests.post(f"{_gemini_base.rstrip('/')}/image-compose", headers={"Authorization": f"Bearer {_gemini_key}", "Content-Type": "application/json"}, json=payload, timeout=300)
-        rr.raise_for_status(); jj = rr.json(); out = jj.get("image") or (jj.get("images") or [None])[0]
-        if not out:
-            raise RuntimeError("Gemini returned no image for moodboard")
-        stills.append(_load_image_from_any(out))
-    if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
-        try:
-            persona_img = upscaler_upscale(persona_img)
-            mood = [upscaler_upscale(im) for im in mood]
-            stills = [upscaler_upscale(im) for im in stills]
-        except Exception:
-            pass
-    # Create a real video per still via Higgsfield using the prompt (if requested)
-    videos: List[str] = []
-    if (outputs or {}).get("videos", True):
-        for st in stills:
-            gen_id = higgsfield_start_video([st], prompt="show this subject wearing the clothes while making outfit/get ready with me content in their bedroom")
-            vp = higgsfield_wait_video(gen_id, timeout_s=600)
-            videos.append(vp)
-
-    uploaded = []
-    errors = []
-    if _slack:
-        try:
-            _slack.chat_postMessage(channel=_slack_channel, text=f"🎯 Influencer bundle for @{username} — {len(mood)} moodboards, {len(stills)} stills, {len(videos)} videos")
-            def save(img, name):
-                p = os.path.join(tempfile.mkdtemp(prefix="bundle_"), name); img.save(p); return p
-            files = [save(persona_img, "persona.png")]
-            if (outputs or {}).get("moodboards", True):
-                files += [save(im, f"mood_{i+1}.png") for i, im in enumerate(mood)]
-            if (outputs or {}).get("stills", True):
-                files += [save(im, f"still_{i+1}.png") for i, im in enumerate(stills)]
-            if (outputs or {}).get("videos", True):
-                for i, vp in enumerate(videos):
-                    files.append(vp)
-            for fp in files:
-                _slack.files_upload_v2(channel=_slack_channel, file=fp, title=os.path.basename(fp))
-                uploaded.append(os.path.basename(fp))
-        except SlackApiError as e:
-            errors.append(str(e))
-    else:
-        errors.append("SLACK_BOT_TOKEN not set; skipping upload")
+        run_id = f"bundle_{uuid.uuid4().hex[:10]}"
+        params = {
+            "username": username,
+            "persona": persona.model_dump() if persona else None,
+            "moodboards": moodboards,
+            "outputs": outputs,
+            "concurrency": concurrency,
+            "fresh": fresh,
+            "regenerate_identity": regenerate_identity,
+        }
+        owner = uuid.uuid4().hex
+        await asyncio.to_thread(_jobs.create, run_id, "bundle", status="running", owner=owner, startedAt=time.time(), params=params)
+        return await _run_bundle_owned(run_id, owner, params, {}, tl, dec)
+
+
+@app.post("/run-full-to-slack/resume")
+async def resume_full_to_slack(run_id: str = Body(..., embed=True)):
+    """Continue a bundle run from its first incomplete stage, reusing every checkpointed output."""
+    j = await asyncio.to_thread(_jobs.get, run_id)
+    if not j or "params" not in j:
+        return {"success": False, "error": "run not found"}
+    if j.get("status") == "completed":
+        return {**j["result"], "resumed": True, "reused": list(BUNDLE_CHECKPOINTS), "stages": {}}
+    # Only a failed run, or one whose runner stopped heartbeating (crashed worker), can be taken over
+    owner = uuid.uuid4().hex
+    if not await asyncio.to_thread(_jobs.claim, run_id, owner, resumedAt=time.time()):
+        return {"success": False, "run_id": run_id, "error": "run is still in progress", "resumable": False}
+    j = await asyncio.to_thread(_jobs.get, run_id) or j  # checkpoints as of the claim
+    with metrics.timeline() as tl, resilience.decisions() as dec, metrics.stage("bundle"), scheduler.priority("batch"):
+        return await _run_bundle_owned(run_id, owner, j["params"], j.get("checkpoints") or {}, tl, dec, resumed=True)
+
+
+class _Superseded(Exception):
+    pass
+
+
+@contextlib.asynccontextmanager
+async def _job_lease(job_id: str, owner: str):
+    """Heartbeat `owner`'s claim on a job while the block runs; the block is cancelled if the claim is lost."""
+    task = asyncio.current_task()
+    lost = False
 
-    # Persist assets to Supabase if configured
-    persisted: Dict[str, Any] = {"persona": None, "moodboards": [], "stills": [], "videos": []}
+    async def _beat():
+        nonlocal lost
+        while True:
+            await asyncio.sleep(_jobs.heartbeat_s)
+            try:
+                held = await asyncio.to_thread(_jobs.heartbeat, job_id, owner)
+            except Exception:
+                metrics.swallowed("job_heartbeat")
+                continue
+            if not held:
+                lost = True
+                task.cancel()
+                return
+
+    beat = _spawn(_beat())
+    try:
+        yield
+    except asyncio.CancelledError:
+        if not lost:
+            raise
+        task.uncancel()
+        raise _Superseded(f"{job_id} was taken over by another runner")
+    finally:
+        beat.cancel()
+
+
+async def _run_bundle_owned(run_id: str, owner: str, params: Dict[str, Any], ckpt: Dict[str, Dict[str, Any]], tl: Dict[str, Any], dec: List[Dict[str, Any]], *, resumed: bool = False) -> Dict[str, Any]:
     try:
-        if _sb_url and _sb_key:
-            base_prefix = f"{username}/{int(time.time())}/"
-            persisted["persona"] = _upload_image(persona_img, base_prefix + "persona.png")
-            if (outputs or {}).get("moodboards", True):
-                for i, im in enumerate(mood):
-                    persisted["moodboards"].append(_upload_image(im, base_prefix + f"mood_{i+1}.png"))
-            if (outputs or {}).get("stills", True):
-                for i, im in enumerate(stills):
-                    persisted["stills"].append(_upload_image(im, base_prefix + f"still_{i+1}.png"))
-            if (outputs or {}).get("videos", True):
-                for i, vp in enumerate(videos):
-                    persisted["videos"].append(_upload_file(vp, base_prefix + f"video_{i+1}.mp4", "video/mp4"))
+        async with _job_lease(run_id, owner):
+            return await _run_bundle(run_id, params, ckpt, tl, dec, resumed=resumed)
+    except _Superseded as e:
+        # The new runner owns the job record now; leave it alone
+        return {"success": False, "run_id": run_id, "error": str(e), "resumable": False}
+
+
+async def _run_bundle(run_id: str, params: Dict[str, Any], ckpt: Dict[str, Dict[str, Any]], tl: Dict[str, Any], dec: List[Dict[str, Any]], *, resumed: bool = False) -> Dict[str, Any]:
+    """Bundle pipeline with a checkpoint per stage output; outputs already in `ckpt` are reused, not regenerated."""
+    username = params["username"]
+    persona = Persona(**params["persona"]) if params.get("persona") else None
+    moodboards: List[str] = params.get("moodboards") or []
+    outputs: Optional[Dict[str, Any]] = params.get("outputs")
+    fresh = bool(params.get("fresh"))
+    report = {s: {"reused": 0, "ran": 0} for s in BUNDLE_CHECKPOINTS}
+    # id(image) -> (image, its checkpoint artifact's path); publishing uploads from these files
+    on_disk: Dict[int, Tuple[ImageRef, str]] = {}
+
+    async def _reuse(stage: str, key: str) -> Optional[ImageRef]:
+        p = _artifacts.locate((ckpt.get(stage) or {}).get(key) or "")
+        if not p:
+            return None
+        report[stage]["reused"] += 1
+        img = ImageRef.from_bytes(await asyncio.to_thread(_read_file, p))
+        on_disk[id(img)] = (img, p)
+        return img
+
+    async def _checkpoint(stage: str, key: str, img: ImageRef) -> ImageRef:
+        artifact_id = await asyncio.to_thread(_artifacts.save_bytes, await _cpu(img.bytes), img.ext)
+        await asyncio.to_thread(_jobs.checkpoint, run_id, stage, key, artifact_id, artifact_id)
+        on_disk[id(img)] = (img, _artifacts.path(artifact_id))
+        report[stage]["ran"] += 1
+        return img
+
+    def _asset(group: str, name: str, img: ImageRef) -> publisher.Asset:
+        saved = on_disk.get(id(img))
+        if saved is not None:
+            return publisher.Asset(group, name, path=saved[1], content_type=img.mime)
+        return publisher.Asset(group, name, image=img)
+
+    try:
+        # Persona: the username's registered identity (generated on first use)
+        ident: Optional[Dict[str, Any]] = None
+        persona_img = await _reuse("persona", "persona")
+        if persona_img is None:
+            ident = await _identity(username, persona, regenerate=bool(params.get("regenerate_identity")))
+            persona_img = await _checkpoint("persona", "persona", ident["base"])
+        # Moodboards: require provided from pipeline
+        if not moodboards:
+            raise RuntimeError("No moodboards provided; UI/server must supply from embeddings pipeline")
+        mood: List[Optional[ImageRef]] = [await _reuse("moodboards", str(i)) for i in range(len(moodboards))]
+        missing = [i for i, im in enumerate(mood) if im is None]
+        fetched = await _images.load_all([moodboards[i] for i in missing])
+        for i, im in zip(missing, await _gather(*[_checkpoint("moodboards", str(i), im) for i, im in zip(missing, fetched)])):
+            mood[i] = im
+        # Stills: one per moodboard via Gemini (required)
+        if not (_gemini_base and _gemini_key):
+            raise RuntimeError("Gemini not configured: set GEMINI_API_BASE and GEMINI_API_KEY")
+        limits = _bundle_limits(params.get("concurrency"))
+        want_videos = (outputs or {}).get("videos", True)
+        do_upscale = bool(os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"))
+        sems = {k: asyncio.Semaphore(v) for k, v in limits.items()}
+
+        async def _upscale(key: str, im: ImageRef, ready: Optional[ImageRef] = None) -> ImageRef:
+            hit = await _reuse("upscales", key)
+            if hit is not None:
+                return hit
+            if ready is not None:
+                return await _checkpoint("upscales", key, ready)
+            async with sems["upscales"]:
+                try:
+                    up = await upscaler_upscale(im, cache=not fresh)
+                except Exception as e:
+                    # Not checkpointed, so a resume tries the upscale again
+                    resilience.fallback("upscaler", "skip_upscale", e)
+                    return im
+            return await _checkpoint("upscales", key, up)
+
+        async def _video(i: int, still: ImageRef) -> str:
+            vid = (ckpt.get("videos") or {}).get(str(i))
+            p = _artifacts.locate(vid or "")
+            if p:
+                report["videos"]["reused"] += 1
+                return p
+            async with sems["videos"]:
+                gen_id = await higgsfield_start_video([still], prompt=BUNDLE_PROMPT)
+                p = await higgsfield_wait_video(gen_id, timeout_s=600)
+            vid = os.path.basename(p)
+            await asyncio.to_thread(_jobs.checkpoint, run_id, "videos", str(i), vid, vid)
+            report["videos"]["ran"] += 1
+            return p
+
+        # Each moodboard is an independent chain: compose -> upscale -> video.
+        # A still moves on to its upscale and video as soon as it is ready.
+        async def _chain(i: int, mb: ImageRef):
+            still = await _reuse("stills", str(i))
+            if still is None:
+                async with sems["stills"]:
+                    still = await _gemini_compose(persona_img, mb, BUNDLE_PROMPT, cache=not fresh)
+                if still is None:
+                    raise RuntimeError("Gemini returned no image for moodboard")
+                await _checkpoint("stills", str(i), still)
+            if do_upscale:
+                still = await _upscale(f"still_{i}", still)
+            if not want_videos:
+                return still, None
+            return still, await _video(i, still)
+
+        async def _upscale_inputs():
+            if not do_upscale:
+                return persona_img, mood
+            return await _gather(_upscale("persona", persona_img, ident["upscaled"] if ident else None), _gather(*[_upscale(f"mood_{i}", im) for i, im in enumerate(mood)]))
+
+        (persona_img, mood), results = await _gather(_upscale_inputs(), _gather(*[_chain(i, mb) for i, mb in enumerate(mood)]))
+        stills: List[ImageRef] = [st for st, _ in results]
+        videos: List[str] = [vp for _, vp in results if vp]
+
+        want = {k: (outputs or {}).get(k, True) for k in ("moodboards", "stills", "videos")}
+        # Checkpointed images are published straight from their artifact files, not a scratch copy
+        assets = [_asset("persona", "persona", persona_img)]
+        if want["moodboards"]:
+            assets += [_asset("moodboards", f"mood_{i+1}", im) for i, im in enumerate(mood)]
+        if want["stills"]:
+            assets += [_asset("stills", f"still_{i+1}", im) for i, im in enumerate(stills)]
+        if want["videos"]:
+            assets += [publisher.Asset("videos", f"video_{i+1}", path=vp, content_type="video/mp4") for i, vp in enumerate(videos)]
+        # Each destination is checkpointed on its own: a resume after a Slack
+        # failure doesn't re-upload to Supabase. Slack is also checkpointed per
+        # batch (publish.slack.uploaded, "partial" until every file is posted),
+        # so a resume posts only the files that never made it.
+        done_publish: Dict[str, Any] = {k: v for k, v in (ckpt.get("publish") or {}).items() if not v.get("partial")}
+        report["publish"]["reused"] = len(done_publish)
+        slack_posted: List[str] = list(((ckpt.get("publish") or {}).get("slack") or {}).get("uploaded") or []) if "slack" not in done_publish else []
+        slack_lock = asyncio.Lock()
+
+        async def _slack_batch(names: List[str]) -> None:
+            # Serialised, so checkpoints land in order and the last one holds every name
+            async with slack_lock:
+                slack_posted.extend(names)
+                await asyncio.to_thread(_jobs.checkpoint, run_id, "publish", "slack", {"uploaded": list(slack_posted), "partial": True})
+
+        pub = publisher.Publisher(
+            slack=await _slack.aget() if _slack and "slack" not in done_publish else None, slack_channel=_slack_channel,
+            upload=_storage.upload_file if _storage and "supabase" not in done_publish else None,
+            slack_done=slack_posted, on_slack_batch=_slack_batch,
+        )
+        if pub.slack is not None or pub.upload is not None:
+            published = await pub.publish(
+                assets,
+                message=f"🎯 Influencer bundle for @{username} — {len(mood)} moodboards, {len(stills)} stills, {len(videos)} videos",
+                prefix=f"{username}/{int(time.time())}/",
+            )
+        else:
+            published = {"stage_ms": 0.0}
+        if isinstance(published.get("slack"), dict):
+            published["slack"]["uploaded"] = list(slack_posted)
+        for dest in ("slack", "supabase"):
+            if isinstance(published.get(dest), dict) and not published[dest].get("error"):
+                await asyncio.to_thread(_jobs.checkpoint, run_id, "publish", dest, published[dest])
+                report["publish"]["ran"] += 1
+        published = {**done_publish, **published}
+
+        errors = []
+        slack_res = published.get("slack") or {}
+        uploaded = slack_res.get("uploaded") or []
+        if not _slack:
+            errors.append("SLACK_BOT_TOKEN not set; skipping upload")
+        elif slack_res.get("error"):
+            errors.append(slack_res["error"])
+        storage = published.get("supabase") or {}
+        if storage.get("error"):
+            errors.append(f"storage: {storage['error']}")
+        by_group = storage.get("persisted") or {}
+        persisted: Dict[str, Any] = {
+            "persona": (by_group.get("persona") or [None])[0],
+            "moodboards": by_group.get("moodboards", []),
+            "stills": by_group.get("stills", []),
+            "videos": by_group.get("videos", []),
+        }
+        publish_timing = {k: v["ms"] for k, v in published.items() if isinstance(v, dict)}
+        publish_timing["stage"] = published["stage_ms"]
+
+        result = {"success": True, "run_id": run_id, "identity_reused": ident["reused"] if ident else None, "uploaded": uploaded, "persisted": persisted, "errors": errors, "counts": {"moodboards": len(mood), "stills": len(stills), "videos": len(videos)}, "outputs": outputs or {"moodboards": True, "stills": True, "videos": True}, "concurrency": limits}
+        publish_failed = any(isinstance(published.get(d), dict) and published[d].get("error") for d in ("slack", "supabase"))
+        if publish_failed:
+            await asyncio.to_thread(_jobs.update, run_id, status="failed", error="; ".join(errors))
+        else:
+            await asyncio.to_thread(_jobs.update, run_id, status="completed", result=result)
+            # Downloaded videos are temp artifacts nobody references once the run is complete
+            for vp in videos:
+                await asyncio.to_thread(_artifacts.delete, os.path.basename(vp))
     except Exception as e:
-        errors.append(f"storage: {str(e)}")
+        await asyncio.to_thread(_jobs.update, run_id, status="failed", error=str(e))
+        return {"success": False, "run_id": run_id, "error": str(e), "resumable": True, **_bundle_report(report, resumed), "timings": metrics.breakdown(tl), "resilience": dec}
 
-    return {"success": True, "uploaded": uploaded, "persisted": persisted, "errors": errors, "counts": {"moodboards": len(mood), "stills": len(stills), "videos": len(videos)}, "outputs": outputs or {"moodboards": True, "stills": True, "videos": True}}
+    return {**result, "resumable": publish_failed, "publish_ms": publish_timing, **_bundle_report(report, resumed), "timings": metrics.breakdown(tl), "resilience": dec}
+
+
+def _bundle_report(report: Dict[str, Dict[str, int]], resumed: bool) -> Dict[str, Any]:
+    """Which stages a (resumed) run took from checkpoints instead of redoing."""
+    return {
+        "resumed": resumed,
+        "reused": [s for s, r in report.items() if r["reused"] and not r["ran"]],
+        "stages": {s: r for s, r in report.items() if r["reused"] or r["ran"]},
+    }
 
 # --------- Higgsfield helpers ---------
-def _image_to_url_or_data(img: Image.Image) -> str:
-    # Prefer data URL for now; platform may accept only URLs—handled by caller if needed
-    return pil_to_data_url(img, fmt="PNG")
+async def _image_to_url_or_data(img: ImageRef) -> str:
+    # The URL it was fetched from (unless IMAGE_FORWARD_URLS=false), else a data URL of the original bytes
+    return await _cpu(img.payload_url)
 
-def higgsfield_start_video(stills: List[Image.Image], prompt: str) -> str:
+async def higgsfield_start_video(stills: List[ImageRef], prompt: str) -> str:
     """Start video via Higgsfield platform API if configured; otherwise legacy fallback."""
     # Platform API required
     if _higgs_key and _higgs_secret and _higgs_platform_base:
         # Use the first still as input image
-        img_url = _image_to_url_or_data(stills[0])
+        img_url = await _image_to_url_or_data(stills[0])
         params: Dict[str, Any] = {
             "model": _higgs_model,
             "prompt": prompt,
@@ -342,17 +793,23 @@ def higgsfield_start_video(stills: List[Image.Image], prompt: str) -> str:
                 "url": os.getenv("HIGGSFIELD_WEBHOOK_URL"),
                 "secret": os.getenv("HIGGSFIELD_WEBHOOK_SECRET", "")
             }
-        r = requests.post(
-            f"{_higgs_platform_base.rstrip('/')}/image2video",
-            headers={
-                "Content-Type": "application/json",
-                "hf-api-key": _higgs_key,
-                "hf-secret": _higgs_secret,
-            },
-            json=body,
-            timeout=300,
-        )
-        r.raise_for_status()
+
+        async def _post() -> Any:
+            r = await http_pool.request(
+                "higgsfield", "POST", f"{_higgs_platform_base.rstrip('/')}/image2video",
+                headers={
+                    "Content-Type": "application/json",
+                    "hf-api-key": _higgs_key,
+                    "hf-secret": _higgs_secret,
+                },
+                json=body,
+            )
+            r.raise_for_status()
+            return r
+
+        # Starting a job isn't idempotent: only retried when the request never got through
+        with metrics.stage("higgsfield_start"):
+            r = await resilience.call("higgsfield", _post, idempotent=False)
         j = r.json()
         gen_id = j.get("job_id") or j.get("id") or j.get("generation_id") or j.get("task_id")
         if not gen_id:
@@ -360,15 +817,71 @@ def higgsfield_start_video(stills: List[Image.Image], prompt: str) -> str:
         return gen_id
     raise RuntimeError("HIGGSFIELD platform API credentials not set (HIGGSFIELD_API_KEY and HIGGSFIELD_API_SECRET)")
 
-def higgsfield_wait_video(generation_id: str, timeout_s: int = 600) -> str:
-    """Poll platform API for completion; return local MP4 path."""
-    start = time.time()
-    while time.time() - start < timeout_s:
-        if not (_higgs_key and _higgs_secret and _higgs_platform_base):
-            raise RuntimeError("HIGGSFIELD platform API credentials not set (HIGGSFIELD_API_KEY and HIGGSFIELD_API_SECRET)")
-        # Platform job status
-        r = requests.get(
-            f"{_higgs_platform_base.rstrip('/')}/jobs/{generation_id}",
+# Webhook deliveries resolve these futures by job id, for waiters in the worker that
+# received them. Every delivery is also recorded in the job store (as job
+# "higgs_<id>"), which waiters in the other workers check every
+# _HIGGS_SHARED_CHECK_S; polling Higgsfield itself is the fallback.
+_HIGGS_WAITERS: Dict[str, asyncio.Future] = {}
+_HIGGS_SHARED_CHECK_S = 1.0
+
+
+def _higgs_parse(j: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(status, video url) from a job status response or webhook payload."""
+    job = ((j.get("jobs") or [None])[0] or {}) if isinstance(j.get("jobs"), list) else {}
+    status_val = j.get("status") or j.get("state") or job.get("status")
+    # Try multiple common shapes for URL
+    vid_url = (
+        j.get("videoUrl") or j.get("video_url") or
+        (j.get("result") or {}).get("video", {}).get("url") or
+        ((j.get("outputs") or [{}])[0] or {}).get("url") or
+        ((job.get("results") or j.get("results") or {}).get("raw") or {}).get("url")
+    )
+    return status_val, vid_url
+
+
+def _higgs_job_id(j: Dict[str, Any]) -> Optional[str]:
+    return j.get("job_id") or j.get("job_set_id") or j.get("id") or j.get("generation_id") or j.get("task_id")
+
+
+def _higgs_waiter(generation_id: str) -> asyncio.Future:
+    fut = asyncio.get_running_loop().create_future()
+    _HIGGS_WAITERS[generation_id] = fut
+    return fut
+
+
+def _higgs_resolve(generation_id: str, payload: Dict[str, Any]) -> bool:
+    fut = _HIGGS_WAITERS.get(generation_id)
+    if fut is not None and not fut.done():
+        fut.set_result(payload)
+        return True
+    return False
+
+
+async def _higgs_delivered(generation_id: str) -> Optional[Dict[str, Any]]:
+    """The latest webhook payload for a job, whichever worker received it."""
+    j = await asyncio.to_thread(_jobs.get, f"higgs_{generation_id}")
+    return j.get("payload") if j else None
+
+
+def _higgs_signature_ok(raw: bytes, headers) -> bool:
+    secret = os.getenv("HIGGSFIELD_WEBHOOK_SECRET") or ""
+    if not secret:
+        return False
+    # Shared-secret header (what we register with the job) or an HMAC-SHA256 of the body
+    sent = headers.get("x-webhook-secret") or headers.get("hf-webhook-secret")
+    if sent:
+        return hmac.compare_digest(sent, secret)
+    sig = headers.get("x-signature") or headers.get("x-webhook-signature") or headers.get("x-hub-signature-256")
+    if sig:
+        expected = hmac.new(secret.encode("utf-8"), raw, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(sig.split("=", 1)[-1].strip().lower(), expected)
+    return False
+
+
+async def _higgs_poll(generation_id: str) -> Dict[str, Any]:
+    async def _get() -> Dict[str, Any]:
+        r = await http_pool.request(
+            "higgsfield", "GET", f"{_higgs_platform_base.rstrip('/')}/jobs/{generation_id}",
             headers={
                 "hf-api-key": _higgs_key,
                 "hf-secret": _higgs_secret,
@@ -376,50 +889,143 @@ def higgsfield_wait_video(generation_id: str, timeout_s: int = 600) -> str:
             timeout=60,
         )
         r.raise_for_status()
-        j = r.json()
-        status_val = j.get("status") or j.get("state")
-        # Try multiple common shapes for URL
-        vid_url = (
-            j.get("videoUrl") or j.get("video_url") or
-            (j.get("result") or {}).get("video", {}).get("url") or
-            ((j.get("outputs") or [{}])[0] or {}).get("url")
-        )
-        if (status_val == "completed" or status_val == "succeeded") and vid_url:
-            tmp = tempfile.mkdtemp(prefix="higgs_")
-            out = os.path.join(tmp, "out.mp4")
-            with requests.get(vid_url, stream=True, timeout=180) as rs:
-                rs.raise_for_status()
-                with open(out, "wb") as f:
-                    for chunk in rs.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-            return out
-        if status_val in ("failed", "canceled", "error"):
-            raise RuntimeError(f"Higgsfield platform video failed: {j}")
-        time.sleep(2)
-    raise RuntimeError("Higgsfield video timeout")
+        return r.json()
+
+    return await resilience.call("higgsfield", _get, idempotent=True)
+
+
+async def _higgs_download(vid_url: str) -> str:
+    """Stream the finished video into a temp artifact; returns its path."""
+    with _artifacts.writer("mp4", temp=True) as (artifact_id, part):
+        async with http_pool.stream("fetch", "GET", vid_url, timeout=180) as rs:
+            rs.raise_for_status()
+            # File I/O in a worker thread, a megabyte at a time, so the loop never waits on the disk
+            f = await asyncio.to_thread(open, part, "wb")
+            try:
+                buf = bytearray()
+                async for chunk in rs.aiter_bytes(chunk_size=65536):
+                    buf += chunk
+                    if len(buf) >= 1 << 20:
+                        await asyncio.to_thread(f.write, buf)
+                        buf.clear()
+                if buf:
+                    await asyncio.to_thread(f.write, buf)
+            finally:
+                await asyncio.to_thread(f.close)
+    return _artifacts.path(artifact_id, temp=True)
+
+
+async def higgsfield_wait_video(generation_id: str, timeout_s: int = 600) -> str:
+    """Wait for a webhook (or fall back to backed-off polling); return local MP4 path."""
+    if not (_higgs_key and _higgs_secret and _higgs_platform_base):
+        raise RuntimeError("HIGGSFIELD platform API credentials not set (HIGGSFIELD_API_KEY and HIGGSFIELD_API_SECRET)")
+    hooked = bool(os.getenv("HIGGSFIELD_WEBHOOK_URL") and os.getenv("HIGGSFIELD_WEBHOOK_SECRET"))
+    # With a webhook registered polling is only a safety net, so it starts slower
+    delay = env_float("HIGGSFIELD_POLL_MIN_S", 10 if hooked else 2)
+    max_delay = env_float("HIGGSFIELD_POLL_MAX_S", 30 if hooked else 10)
+    start = time.time()
+    next_poll = start + delay if hooked else start
+    fut = _higgs_waiter(generation_id)
+    try:
+        with metrics.stage("higgsfield_queue_wait"):
+            while time.time() - start < timeout_s:
+                j = None
+                if fut.done():
+                    j = fut.result()
+                    fut = _higgs_waiter(generation_id)
+                elif hooked:
+                    # The delivery may have landed on another worker
+                    j = await _higgs_delivered(generation_id)
+                if j is None and time.time() >= next_poll:
+                    j = await _higgs_poll(generation_id)
+                    next_poll = time.time() + delay
+                    delay = min(delay * 1.5, max_delay)
+                if j is not None:
+                    status_val, vid_url = _higgs_parse(j)
+                    if (status_val == "completed" or status_val == "succeeded") and vid_url:
+                        break
+                    if status_val in ("failed", "canceled", "error", "nsfw"):
+                        raise RuntimeError(f"Higgsfield platform video failed: {j}")
+                # Sleep until a local delivery, the next shared-store check or the next poll
+                wait = min(next_poll - time.time(), timeout_s - (time.time() - start))
+                if hooked:
+                    wait = min(wait, _HIGGS_SHARED_CHECK_S)
+                try:
+                    await asyncio.wait_for(asyncio.shield(fut), timeout=max(0.0, wait))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                raise RuntimeError("Higgsfield video timeout")
+        with metrics.stage("higgsfield_download"):
+            return await resilience.call("higgsfield", partial(_higgs_download, vid_url), idempotent=True)
+    finally:
+        if _HIGGS_WAITERS.get(generation_id) is fut:
+            _HIGGS_WAITERS.pop(generation_id, None)
+
+
+@app.post("/webhooks/higgsfield")
+async def higgsfield_webhook(request: Request):
+    raw = await request.body()
+    if not _higgs_signature_ok(raw, request.headers):
+        return ORJSONResponse({"success": False, "error": "invalid webhook signature"}, status_code=status.HTTP_401_UNAUTHORIZED)
+    try:
+        payload = json.loads(raw or b"{}")
+    except ValueError:
+        return ORJSONResponse({"success": False, "error": "invalid JSON"}, status_code=status.HTTP_400_BAD_REQUEST)
+    gen_id = _higgs_job_id(payload) if isinstance(payload, dict) else None
+    if not gen_id:
+        return ORJSONResponse({"success": False, "error": "missing job id"}, status_code=status.HTTP_400_BAD_REQUEST)
+    # Recorded for waiters in other workers, and for ones that start waiting after it arrives
+    await asyncio.to_thread(_jobs.put, f"higgs_{gen_id}", "higgsfield_webhook", status="completed", payload=payload)
+    return {"success": True, "job_id": gen_id, "matched": _higgs_resolve(str(gen_id), payload)}
 
 # --------- Character builder (prompt + variants) ----------
-CHAR_JOBS: Dict[str, Dict[str, Any]] = {}
+# Job metadata lives in SQLite (shared by all workers); images are artifacts referenced by URL
+_jobs = job_store.from_env()
+# username + persona -> identity prompt, base and upscaled base, reused across calls
+_identities = identity.from_env()
+# Weak values: a lock lives only while someone holds or waits on it, so keys don't pile up
+_identity_locks: "weakref.WeakValueDictionary[Tuple[str, str], asyncio.Lock]" = weakref.WeakValueDictionary()
+# "local" serves images from /artifacts/<id>; "supabase" uploads them to the storage bucket
+_char_artifact_backend = (os.getenv("CHAR_ARTIFACT_BACKEND") or "local").lower()
+# Strong refs so background builds aren't garbage-collected mid-run
+_BG_TASKS: set = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_BG_TASKS.discard)
+    return task
 
-def _sb_upload_bytes(path_key: str, data: bytes, content_type: str) -> str:
-    if not _sb_url or not _sb_key:
+
+async def _char_job_update(job_id: str, **fields: Any) -> None:
+    await asyncio.to_thread(_jobs.update, job_id, **fields)
+
+
+async def _store_image(img: ImageRef, path_key: str) -> Tuple[str, Optional[str]]:
+    """Persist an image outside the process; returns (url, local artifact id or None)."""
+    data = await _cpu(img.bytes)
+    if _char_artifact_backend == "supabase":
+        return await _sb_upload_bytes(_with_ext(path_key, img.ext), data, img.mime), None
+    artifact_id = await asyncio.to_thread(_artifacts.save_bytes, data, img.ext)
+    return _artifacts.url(artifact_id), artifact_id
+
+async def _sb_upload_bytes(path_key: str, data: bytes, content_type: str) -> str:
+    if not _storage:
         raise RuntimeError("Supabase storage not configured: set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
-    url = f"{_sb_url.rstrip('/')}/storage/v1/object/{_sb_bucket}/{path_key}"
-    r = requests.put(url, headers={"Authorization": f"Bearer {_sb_key}", "Content-Type": content_type}, data=data, timeout=120)
-    r.raise_for_status()
-    # Assume bucket is public
-    return f"{_sb_url.rstrip('/')}/storage/v1/object/public/{_sb_bucket}/{path_key}"
+    with metrics.stage("supabase_upload"):
+        return await _storage.upload_bytes(path_key, data, content_type)
 
-def _upload_image(img: Image.Image, path_key: str) -> str:
-    buf = io.BytesIO(); img.save(buf, format="PNG"); return _sb_upload_bytes(path_key, buf.getvalue(), "image/png")
+def _with_ext(path_key: str, ext: str) -> str:
+    return f"{os.path.splitext(path_key)[0]}.{ext}"
 
-def _upload_file(path: str, path_key: str, content_type: str) -> str:
+def _read_file(path: str) -> bytes:
     with open(path, "rb") as f:
-        return _sb_upload_bytes(path_key, f.read(), content_type)
+        return f.read()
 
 @app.post("/character/prompt")
-def character_prompt(persona: Optional[Persona] = Body(None)):
+async def character_prompt(persona: Optional[Persona] = Body(None)):
     if not _openai:
         return {"success": False, "error": "OPENAI_API_KEY not set"}
     sys = (
@@ -433,7 +1039,8 @@ def character_prompt(persona: Optional[Persona] = Body(None)):
         "'consistent eye color', 'consistent hairstyle', 'consistent race/ethnicity', 'same height/weight'. "
         "Use precise photographic language; 85mm portrait quality."
     )
-    res = _openai.chat.completions.create(
+    client = await _openai.aget()
+    res = await client.chat.completions.create(
         model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
         messages=[{"role":"system","content":sys},{"role":"user","content":user}],
         temperature=0.25,
@@ -443,118 +1050,259 @@ def character_prompt(persona: Optional[Persona] = Body(None)):
     return {"success": True, "prompt": prompt}
 
 
+async def _identity(username: str, persona: Optional[Persona], *, regenerate: bool = False) -> Dict[str, Any]:
+    """Identity prompt, base image and upscaled base for this username + persona.
+
+    Served from the registry when present; otherwise generated once (OpenAI
+    prompt, FLUX base, upscale) and registered. `regenerate` replaces the
+    entry with a new character (bypassing the result cache too); a request's
+    `fresh` flag never does -- it only resamples that request's own outputs.
+    """
+    p_hash = identity.persona_hash(persona.model_dump() if persona else None)
+    do_upscale = bool(os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"))
+    # Concurrent first calls for one identity generate it once
+    lock = _identity_locks.get((username, p_hash))
+    if lock is None:
+        lock = _identity_locks[(username, p_hash)] = asyncio.Lock()
+    async with lock:
+        entry = None if regenerate else await asyncio.to_thread(_identities.get, username, p_hash)
+        base_p = _artifacts.locate(entry["base_artifact"]) if entry else None
+        up_p = _artifacts.locate(entry["upscaled_artifact"] or "") if entry else None
+        if base_p:
+            metrics.inc("influencer_identity_lookups_total", help_text="Identity registry lookups", result="hit")
+            prompt = entry["prompt"]
+            base = ImageRef.from_bytes(await asyncio.to_thread(_read_file, base_p))
+            upscaled = ImageRef.from_bytes(await asyncio.to_thread(_read_file, up_p)) if up_p else None
+            if upscaled is not None or not do_upscale:
+                return {"prompt": prompt, "base": base, "upscaled": upscaled, "reused": True}
+        else:
+            metrics.inc("influencer_identity_lookups_total", help_text="Identity registry lookups", result="miss")
+            with metrics.stage("identity_create"):
+                pr = await character_prompt(persona)
+                prompt = pr.get("prompt") or persona_to_prompt(persona)
+                base = await flux_txt2img(prompt, negative=IDENTITY_LOCK_NEGATIVE, seed=DEFAULT_SEED, cache=not regenerate)
+            upscaled = None
+        # Missing upscale (new identity, or an earlier upscale fell back): try it now
+        if do_upscale:
+            try:
+                upscaled = await upscaler_upscale(base, cache=not regenerate)
+            except Exception as e:
+                resilience.fallback("upscaler", "skip_upscale", e)
+        base_id = entry["base_artifact"] if base_p else await asyncio.to_thread(_artifacts.save_bytes, await _cpu(base.bytes), base.ext)
+        up_id = await asyncio.to_thread(_artifacts.save_bytes, await _cpu(upscaled.bytes), upscaled.ext) if upscaled is not None else None
+        for artifact_id in await asyncio.to_thread(_identities.put, username, p_hash, prompt, base_id, up_id):
+            await asyncio.to_thread(_artifacts.delete, artifact_id)
+        return {"prompt": prompt, "base": base, "upscaled": upscaled, "reused": bool(base_p)}
+
+
+@app.get("/identity")
+async def identity_entries(username: str):
+    rows = await asyncio.to_thread(_identities.entries, username)
+    return {"success": True, "identities": [
+        {
+            "persona_hash": r["persona_hash"],
+            "prompt": r["prompt"],
+            "base": _artifacts.url(r["base_artifact"]),
+            "upscaled": _artifacts.url(r["upscaled_artifact"]) if r["upscaled_artifact"] else None,
+            "created_at": r["created_at"],
+            "used_at": r["used_at"],
+        }
+        for r in rows
+    ]}
+
+
+@app.post("/identity/invalidate")
+async def identity_invalidate(username: str = Body(..., embed=True), persona: Optional[Persona] = Body(None)):
+    """Forget a username's identity (only the given persona's, if one is sent); the next call regenerates it."""
+    p_hash = identity.persona_hash(persona.model_dump()) if persona else None
+    removed = await asyncio.to_thread(_identities.invalidate, username, p_hash)
+    for artifact_id in removed:
+        await asyncio.to_thread(_artifacts.delete, artifact_id)
+    return {"success": True, "removed_artifacts": len(removed)}
+
+
 @app.post("/character/build")
-def character_build(
+async def character_build(
     username: str = Body(..., embed=True),
     persona: Optional[Persona] = Body(None),
     count: int = Body(25, embed=True),
+    fresh: bool = Body(False, embed=True),
+    regenerate_identity: bool = Body(False, embed=True),
 ):
     job_id = f"char_{uuid.uuid4().hex[:10]}"
-    CHAR_JOBS[job_id] = {"status": "queued", "username": username, "startedAt": time.time()}
+    # Owned and heartbeated like bundle runs, so a build whose worker dies is failed instead of running forever
+    owner = uuid.uuid4().hex
+    await asyncio.to_thread(_jobs.create, job_id, "character", status="running", owner=owner, username=username, startedAt=time.time(), progress={"done": 0, "total": max(1, int(count))})
 
-    def _bg():
-        try:
-            CHAR_JOBS[job_id]["status"] = "running"
-            # 1) Prompt
-            pr = character_prompt(persona)
-            id_prompt = pr.get("prompt", persona_to_prompt(persona))
-            CHAR_JOBS[job_id]["prompt"] = id_prompt
-            # 2) Base
-            base = flux_txt2img(id_prompt)
-            if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
-                try:
-                    base = upscaler_upscale(base)
-                except Exception:
-                    pass
-            base_url = pil_to_data_url(base)
-            # 3) Variants
-            angles = ["front", "3/4 left", "3/4 right", "profile left", "profile right"]
-            zooms = ["head-and-shoulders", "torso", "full body"]
-            bgs = ["bedroom", "closet", "mirror", "window light", "neutral wall"]
-            outfits = ["denim jacket + tee", "knit sweater + pleated skirt", "cargo pants + crop top", "blazer + jeans", "summer dress"]
-            identity = "same person, maintain identity, do not change face/hair/skin tone/eye color, same ethnicity, same hair"
-            variants: List[str] = []
-            i = 0
-            while len(variants) < max(1, int(count)):
-                angle = angles[i % len(angles)]
-                zoom = zooms[i % len(zooms)]
-                bg = bgs[i % len(bgs)]
-                outfit = outfits[i % len(outfits)]
-                v_prompt = f"{id_prompt}; {identity}; pose: {angle}; framing: {zoom}; background: {bg}; outfit: {outfit}"
-                img = flux_i2i(base, v_prompt, strength=0.35, negative=IDENTITY_LOCK_NEGATIVE, seed=DEFAULT_SEED)
-                if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
-                    try:
-                        img = upscaler_upscale(img)
-                    except Exception:
-                        pass
-                variants.append(pil_to_data_url(img))
-                i += 1
-            CHAR_JOBS[job_id].update({"status": "completed", "base": base_url, "variants": variants, "count": len(variants)})
-        except Exception as e:
-            CHAR_JOBS[job_id].update({"status": "failed", "error": str(e)})
+    async def _bg():
+        with metrics.timeline() as tl, resilience.decisions() as dec, metrics.stage("character_build"), scheduler.priority("batch"):
+            try:
+                async with _job_lease(job_id, owner):
+                    # 1-2) Identity prompt and base: from the registry, generated on first use
+                    ident = await _identity(username, persona, regenerate=regenerate_identity)
+                    id_prompt = ident["prompt"]
+                    await _char_job_update(job_id, prompt=id_prompt, identityReused=ident["reused"])
+                    base = ident["upscaled"] or ident["base"]
+                    base_url, base_artifact = await _store_image(base, f"{username}/characters/{job_id}/base.png")
+                    await _char_job_update(job_id, base=base_url, artifacts=[base_artifact] if base_artifact else [])
+                    # 3) Variants: fan out with bounded concurrency, publish each one as it lands
+                    angles = ["front", "3/4 left", "3/4 right", "profile left", "profile right"]
+                    zooms = ["head-and-shoulders", "torso", "full body"]
+                    bgs = ["bedroom", "closet", "mirror", "window light", "neutral wall"]
+                    outfits = ["denim jacket + tee", "knit sweater + pleated skirt", "cargo pants + crop top", "blazer + jeans", "summer dress"]
+                    identity = "same person, maintain identity, do not change face/hair/skin tone/eye color, same ethnicity, same hair"
+                    total = max(1, int(count))
+                    done = 0
+                    flux_sem = asyncio.Semaphore(max(1, env_int("CHAR_BUILD_CONCURRENCY", 4)))
+                    upscale_sem = asyncio.Semaphore(max(1, env_int("CHAR_BUILD_UPSCALE_CONCURRENCY", 2)))
+
+                    async def _variant(i: int) -> None:
+                        nonlocal done
+                        angle = angles[i % len(angles)]
+                        zoom = zooms[i % len(zooms)]
+                        bg = bgs[i % len(bgs)]
+                        outfit = outfits[i % len(outfits)]
+                        v_prompt = f"{id_prompt}; {identity}; pose: {angle}; framing: {zoom}; background: {bg}; outfit: {outfit}"
+                        async with flux_sem:
+                            img = await flux_i2i(base, v_prompt, strength=0.35, negative=IDENTITY_LOCK_NEGATIVE, seed=DEFAULT_SEED, cache=not fresh)
+                        if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
+                            async with upscale_sem:
+                                try:
+                                    img = await upscaler_upscale(img, cache=not fresh)
+                                except Exception as e:
+                                    resilience.fallback("upscaler", "skip_upscale", e)
+                        url, artifact_id = await _store_image(img, f"{username}/characters/{job_id}/variant_{i+1}.png")
+                        await asyncio.to_thread(_jobs.add_item, job_id, i, url, artifact_id)
+                        done += 1
+                        await _char_job_update(job_id, progress={"done": done, "total": total})
+
+                    await _gather(*[_variant(i) for i in range(total)])
+                    await _char_job_update(job_id, status="completed", count=total, timings=metrics.breakdown(tl), resilience=dec)
+            except _Superseded:
+                pass  # someone else holds the job record now
+            except Exception as e:
+                await _char_job_update(job_id, status="failed", error=str(e), timings=metrics.breakdown(tl), resilience=dec)
 
-    threading.Thread(target=_bg, daemon=True).start()
+    _spawn(_bg())
     return {"success": True, "job_id": job_id}
 
 
 @app.get("/character/build-status")
-def character_build_status(job_id: str):
-    j = CHAR_JOBS.get(job_id)
+async def character_build_status(job_id: str, cursor: Optional[int] = None):
+    """Job status. With `cursor`, `variants` holds only those published after it."""
+    j = await asyncio.to_thread(_jobs.get, job_id)
     if not j:
         return {"success": False, "error": "job not found"}
-    return {"success": True, **j}
+    j.pop("artifacts", None)
+    items = await asyncio.to_thread(_jobs.items, job_id, cursor or 0)
+    next_cursor = items[-1]["seq"] if items else (cursor or 0)
+    if cursor is not None:
+        variants: List[Any] = [{"index": it["idx"], "url": it["url"], "seq": it["seq"]} for it in items]
+    else:
+        # Completed variants only, always in index order
+        variants = [it["url"] for it in sorted(items, key=lambda it: it["idx"])]
+    return {"success": True, **j, "variants": variants, "cursor": next_cursor}
+
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/character/build-events")
+async def character_build_events(request: Request, job_id: str, cursor: int = 0):
+    """Server-sent events: `status` on every status/progress change, `variant` per new variant, then `done`."""
+    # EventSource reconnects send the last seen variant seq back
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        cursor = max(cursor, int(last_id))
+    poll_s = env_float("SSE_POLL_S", 0.5)
+
+    async def _events():
+        seen = cursor
+        last_status: Optional[str] = None
+        last_beat = time.time()
+        while True:
+            j = await asyncio.to_thread(_jobs.get, job_id)
+            if not j:
+                yield _sse("error", {"error": "job not found"})
+                return
+            j.pop("artifacts", None)
+            snapshot = json.dumps({k: j.get(k) for k in ("status", "progress", "base", "prompt", "error")}, sort_keys=True)
+            if snapshot != last_status:
+                last_status = snapshot
+                yield _sse("status", {"job_id": job_id, **j})
+            for it in await asyncio.to_thread(_jobs.items, job_id, seen):
+                seen = it["seq"]
+                yield _sse("variant", {"index": it["idx"], "url": it["url"]}, event_id=seen)
+            if j.get("status") in job_store.FINISHED:
+                yield _sse("done", {"status": j.get("status"), "error": j.get("error"), "cursor": seen})
+                return
+            if await request.is_disconnected():
+                return
+            if time.time() - last_beat > 15:
+                last_beat = time.time()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(poll_s)
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # --------- Still and Video endpoints using character + moodboard ----------
 @app.post("/still")
-def generate_still(
+async def generate_still(
     username: str = Body(..., embed=True),
-    character_base: str = Body(..., embed=True),  # data URL or http
+    character_base: Optional[str] = Body(None, embed=True),  # data URL, http or /artifacts/<id>; default: the username's registered identity
     moodboard_url: str = Body(..., embed=True),
+    persona: Optional[Persona] = Body(None),
     prompt: str = Body("show this subject wearing the clothes while making outfit/get ready with me content in their bedroom", embed=True),
+    fresh: bool = Body(False, embed=True),
+    regenerate_identity: bool = Body(False, embed=True),
+    response_mode: Optional[str] = Body(None, embed=True),  # "artifact" | "inline"
 ):
     # Use Gemini (nanobanana) to compose a guided still from the character + moodboard
     if not _gemini_base or not _gemini_key:
         return {"success": False, "error": "Gemini not configured"}
-    payload = {
-        "model": _gemini_model,
-        "character": character_base,
-        "moodboard": moodboard_url,
-        "prompt": prompt,
-    }
-    r = requests.post(
-        f"{_gemini_base.rstrip('/')}/image-compose",
-        headers={"Authorization": f"Bearer {_gemini_key}", "Content-Type": "application/json"},
-        json=payload,
-        timeout=300,
-    )
-    r.raise_for_status()
-    j = r.json()
-    out = j.get("image") or (j.get("images") or [None])[0]
-    if not out:
-        return {"success": False, "error": "Gemini returned no image"}
-    img = _load_image_from_any(out)
-    if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
-        try:
-            img = upscaler_upscale(img)
-        except Exception:
-            pass
-    return {"success": True, "imageUrl": pil_to_data_url(img)}
+    with resilience.decisions() as dec:
+        async def _character() -> ImageRef:
+            if character_base is None:
+                return (await _identity(username, persona, regenerate=regenerate_identity))["base"]
+            return await _images.load(character_base)
+
+        # Our own artifact URLs are read from disk and sent as image data, never forwarded
+        character, moodboard = await _gather(_character(), _images.load(moodboard_url))
+        img = await _gemini_compose(character, moodboard, prompt, cache=not fresh)
+        if img is None:
+            return {"success": False, "error": "Gemini returned no image", "resilience": dec}
+        if os.getenv("UPSCALER_API_BASE") and os.getenv("UPSCALER_API_KEY"):
+            try:
+                img = await upscaler_upscale(img, cache=not fresh)
+            except Exception as e:
+                resilience.fallback("upscaler", "skip_upscale", e)
+    return {"success": True, "imageUrl": await _image_out(img, _response_mode(response_mode)), "resilience": dec}
 
 
 @app.post("/video-from-stills")
-def video_from_stills(
+async def video_from_stills(
     username: str = Body(..., embed=True),
     stills: List[str] = Body(...),  # list of data URLs or http
     prompt: str = Body("show this subject wearing the clothes while making outfit/get ready with me content in their bedroom", embed=True),
+    response_mode: Optional[str] = Body(None, embed=True),  # "artifact" | "inline"
+    hold_s: Optional[List[float]] = Body(None, embed=True),  # local fallback: seconds per still
+    crossfade_s: float = Body(0.0, embed=True),  # local fallback: fade between stills
 ):
-    # Convert incoming stills to PIL, then pass to Higgsfield; return MP4 data url
-    images = [_load_image_from_any(s) for s in stills]
-    try:
-        gen_id = higgsfield_start_video(images, prompt=prompt)
-        vid_path = higgsfield_wait_video(gen_id, timeout_s=600)
-    except Exception as e:
-        # Fallback to local assembly
-        vid_path = make_video_from_images(images, fps=24, seconds=6)
-    return {"success": True, "videoUrl": video_to_data_url(vid_path)}
+    # Load incoming stills, then pass to Higgsfield; return an artifact URL (or MP4 data URL)
+    with metrics.timeline() as tl, resilience.decisions() as dec, metrics.stage("video_from_stills"):
+        images = await _images.load_all(stills)
+        try:
+            gen_id = await higgsfield_start_video(images, prompt=prompt)
+            vid_path = await higgsfield_wait_video(gen_id, timeout_s=600)
+        except Exception as e:
+            # Fallback to local assembly
+            resilience.fallback("higgsfield", "local_video", e)
+            vid_path = await _cpu(make_video_from_images, images, fps=24, seconds=6, hold_s=hold_s, crossfade_s=crossfade_s)
+        video_url = await _video_out(vid_path, _response_mode(response_mode))
+        return {"success": True, "videoUrl": video_url, "timings": metrics.breakdown(tl), "resilience": dec}
+
 
+startup.mark("module")
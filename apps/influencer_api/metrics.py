@@ -0,0 +1,149 @@
+"""In-process metrics with a Prometheus text exposition (/metrics).
+
+`stage(name)` times a block (sync code, or code that awaits inside it):
+latency histogram, in-flight gauge and error counter per stage. Provider
+bytes in/out are counted by http_pool, and `swallowed(stage)` counts the
+exceptions we deliberately ignore (e.g. an upscale failure that falls back to
+the original image).
+
+`timeline()` opens a per-request breakdown: every stage that runs in that
+context -- including tasks spawned from it and work sent to thread pools with
+the context copied -- adds its count and time, so a response can report where
+its own minutes went.
+
+Each uvicorn worker keeps its own registry; scrape every worker (or run one).
+"""
+import contextlib, contextvars, threading, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_lock = threading.Lock()
+_types: Dict[str, str] = {}
+_help: Dict[str, str] = {}
+_values: Dict[_Key, float] = {}
+_hists: Dict[_Key, List[float]] = {}  # bucket counts..., sum, count
+_timeline: contextvars.ContextVar[Optional[Dict[str, Dict[str, float]]]] = contextvars.ContextVar("metrics_timeline", default=None)
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _declare(name: str, kind: str, help_text: str) -> None:
+    _types.setdefault(name, kind)
+    _help.setdefault(name, help_text)
+
+
+def inc(name: str, value: float = 1.0, *, help_text: str = "", **labels: Any) -> None:
+    with _lock:
+        _declare(name, "counter", help_text)
+        k = _key(name, labels)
+        _values[k] = _values.get(k, 0.0) + value
+
+
+def gauge_add(name: str, delta: float, *, help_text: str = "", **labels: Any) -> None:
+    with _lock:
+        _declare(name, "gauge", help_text)
+        k = _key(name, labels)
+        _values[k] = _values.get(k, 0.0) + delta
+
+
+def observe(name: str, value: float, *, help_text: str = "", **labels: Any) -> None:
+    with _lock:
+        _declare(name, "histogram", help_text)
+        h = _hists.setdefault(_key(name, labels), [0.0] * (len(BUCKETS) + 2))
+        for i, b in enumerate(BUCKETS):
+            if value <= b:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+
+def add_bytes(provider: str, direction: str, n: int) -> None:
+    if n:
+        inc("influencer_provider_bytes_total", n, help_text="Bytes sent to (out) / received from (in) each provider", provider=provider, direction=direction)
+
+
+def swallowed(stage_name: str) -> None:
+    """Count an exception that was caught and deliberately ignored."""
+    inc("influencer_swallowed_exceptions_total", help_text="Exceptions caught and ignored (fallback taken)", stage=stage_name)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    gauge_add("influencer_stage_inflight", 1, help_text="Stage executions currently running", stage=name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("influencer_stage_errors_total", help_text="Stage executions that raised", stage=name)
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        gauge_add("influencer_stage_inflight", -1, stage=name)
+        observe("influencer_stage_seconds", dt, help_text="Stage latency", stage=name)
+        tl = _timeline.get()
+        if tl is not None:
+            with _lock:
+                e = tl.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                e["count"] += 1
+                e["total_ms"] += dt * 1000
+                e["max_ms"] = max(e["max_ms"], dt * 1000)
+
+
+@contextlib.contextmanager
+def timeline() -> Iterator[Dict[str, Dict[str, float]]]:
+    """Collect a per-request stage breakdown; read it with `breakdown()` before leaving the block."""
+    tl: Dict[str, Dict[str, float]] = {}
+    token = _timeline.set(tl)
+    try:
+        yield tl
+    finally:
+        _timeline.reset(token)
+
+
+def breakdown(tl: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {
+            k: {"count": int(v["count"]), "total_ms": round(v["total_ms"], 1), "max_ms": round(v["max_ms"], 1)}
+            for k, v in sorted(tl.items())
+        }
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def render() -> str:
+    """Prometheus text exposition format 0.0.4."""
+    with _lock:
+        values = dict(_values)
+        hists = {k: list(v) for k, v in _hists.items()}
+        types = dict(_types)
+        helps = dict(_help)
+    lines: List[str] = []
+    for name in sorted(types):
+        if helps.get(name):
+            lines.append(f"# HELP {name} {helps[name]}")
+        lines.append(f"# TYPE {name} {types[name]}")
+        if types[name] == "histogram":
+            for (n, labels), h in sorted(hists.items()):
+                if n != name:
+                    continue
+                for i, b in enumerate(BUCKETS):
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', str(b)))} {int(h[i])}")
+                lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {int(h[-1])}")
+                lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(labels)} {int(h[-1])}")
+        else:
+            for (n, labels), v in sorted(values.items()):
+                if n == name:
+                    lines.append(f"{name}{_fmt_labels(labels)} {v:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+"""Publishing stage for bundle runs: Slack and Supabase fed from one scratch copy.
+
+Every asset is written once, as the encoded bytes it already has, into a
+single scratch directory for the run (files that already exist on disk, like
+downloaded videos and bundle checkpoints, are used in place). Both destinations then upload from
+those files at the same time, each with bounded parallelism; Slack gets
+several files per files_upload_v2 call. The scratch directory is removed when
+publishing finishes, whatever the outcome.
+
+Env:
+  PUBLISH_CONCURRENCY   parallel uploads per destination (default 4)
+  SLACK_UPLOAD_BATCH    files per Slack files_upload_v2 call (default 10)
+  PUBLISH_SCRATCH_DIR   parent directory for per-run scratch dirs (default system temp)
+"""
+import asyncio, os, shutil, tempfile, time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from . import metrics
+from .imaging import ImageRef
+from ._env import env_int
+
+# (path_key, local path, content type) -> public URL
+Uploader = Callable[[str, str, str], Awaitable[str]]
+
+
+class Asset:
+    """One file to publish; `group` is the result bucket (persona, stills, ...)."""
+
+    def __init__(self, group: str, name: str, *, image: Optional[ImageRef] = None, path: Optional[str] = None, content_type: Optional[str] = None):
+        if (image is None) == (path is None):
+            raise ValueError("Asset needs exactly one of image or path")
+        self.group = group
+        self.image = image
+        self.path = path
+        self.content_type = content_type or (image.mime if image is not None else "application/octet-stream")
+        # Image names follow their actual encoding; paths keep their own extension
+        self.name = f"{name}.{image.ext}" if image is not None else f"{name}{os.path.splitext(path)[1]}"
+
+
+def _stage(assets: List[Asset], scratch: str) -> None:
+    for a in assets:
+        if a.path is None:
+            a.path = os.path.join(scratch, a.name)
+            with open(a.path, "wb") as f:
+                f.write(a.image.bytes())
+
+
+class Publisher:
+    def __init__(
+        self, *, slack: Any = None, slack_channel: Optional[str] = None, upload: Optional[Uploader] = None,
+        slack_done: Iterable[str] = (), on_slack_batch: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    ):
+        self.slack = slack
+        self.slack_channel = slack_channel
+        self.upload = upload
+        # Resumed runs: file names already posted to Slack are skipped, and each
+        # posted batch is reported so the caller can checkpoint it
+        self.slack_done = set(slack_done)
+        self.on_slack_batch = on_slack_batch
+        self.concurrency = max(1, env_int("PUBLISH_CONCURRENCY", 4))
+        self.slack_batch = max(1, env_int("SLACK_UPLOAD_BATCH", 10))
+
+    async def _to_slack(self, assets: List[Asset], message: str) -> Dict[str, Any]:
+        sem = asyncio.Semaphore(self.concurrency)
+        assets = [a for a in assets if a.name not in self.slack_done]
+        batches = [assets[i:i + self.slack_batch] for i in range(0, len(assets), self.slack_batch)]
+
+        async def _batch(batch: List[Asset], comment: Optional[str]) -> List[str]:
+            async with sem:
+                with metrics.stage("slack_upload"):
+                    await asyncio.to_thread(
+                        self.slack.files_upload_v2,
+                        channel=self.slack_channel,
+                        file_uploads=[{"file": a.path, "filename": a.name, "title": a.name} for a in batch],
+                        initial_comment=comment,
+                    )
+            names = [a.name for a in batch]
+            if self.on_slack_batch is not None:
+                await self.on_slack_batch(names)
+            return names
+
+        # The first batch carries the summary message, so it lands ahead of the rest
+        # (a resumed publish posted it the first time round)
+        uploaded = await _batch(batches[0], None if self.slack_done else message) if batches else []
+        errors = []
+        for r in await asyncio.gather(*[_batch(b, None) for b in batches[1:]], return_exceptions=True):
+            if isinstance(r, Exception):
+                errors.append(str(r))
+            else:
+                uploaded += r
+        return {"uploaded": uploaded, "calls": len(batches), "error": "; ".join(errors) or None}
+
+    async def _to_storage(self, assets: List[Asset], prefix: str) -> Dict[str, Any]:
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _one(a: Asset) -> str:
+            async with sem:
+                with metrics.stage("supabase_upload"):
+                    return await self.upload(prefix + a.name, a.path, a.content_type)
+
+        urls = await asyncio.gather(*[_one(a) for a in assets], return_exceptions=True)
+        persisted: Dict[str, Any] = {}
+        errors = []
+        for a, url in zip(assets, urls):
+            if isinstance(url, Exception):
+                errors.append(f"{a.name}: {url}")
+            else:
+                persisted.setdefault(a.group, []).append(url)
+        return {"persisted": persisted, "error": "; ".join(errors) or None}
+
+    async def publish(self, assets: List[Asset], *, message: str, prefix: str) -> Dict[str, Any]:
+        """Upload to every configured destination concurrently; returns per-destination results and timings."""
+        scratch = tempfile.mkdtemp(prefix="publish_", dir=os.getenv("PUBLISH_SCRATCH_DIR") or None)
+
+        async def _timed(name: str, coro: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            try:
+                out = await coro
+            except Exception as e:
+                out = {"error": str(e)}
+            out["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            return {name: out}
+
+        try:
+            t0 = time.perf_counter()
+            await asyncio.to_thread(_stage, assets, scratch)
+            staged_ms = round((time.perf_counter() - t0) * 1000, 1)
+            jobs = []
+            if self.slack is not None:
+                jobs.append(_timed("slack", self._to_slack(assets, message)))
+            if self.upload is not None:
+                jobs.append(_timed("supabase", self._to_storage(assets, prefix)))
+            results: Dict[str, Any] = {"stage_ms": staged_ms}
+            for r in await asyncio.gather(*jobs):
+                results.update(r)
+            return results
+        finally:
+            await asyncio.to_thread(shutil.rmtree, scratch, True)
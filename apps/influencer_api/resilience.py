@@ -0,0 +1,243 @@
+"""Retries, hedged requests and circuit breakers for provider calls.
+
+`call(provider, fn, idempotent=...)` runs one provider round trip (`fn` must be
+safe to call again):
+
+- Retries: provider faults (5xx, 408, 429, transport errors) are retried with
+  full-jitter exponential backoff, honouring Retry-After on 429. Idempotent
+  requests -- seeded FLUX generations, upscales, compositions, status polls --
+  retry on any of them; the rest only when the request never reached the
+  provider (connect failures, 429), so a retry can't start a second job.
+- Hedging: for providers listed in RESILIENCE_HEDGE_PROVIDERS, an idempotent
+  call that is still running after the provider's recent p95 latency gets one
+  duplicate; whichever answers first wins and the other is cancelled.
+- Circuit breakers: after CIRCUIT_FAILURES consecutive faults a provider's
+  breaker opens and calls fail fast with CircuitOpen; after the cooldown one
+  probe call is let through, and its outcome closes or re-opens the breaker.
+  Client errors (other 4xx) don't count -- they say nothing about provider health.
+
+Every retry, hedge, fast failure and fallback taken by the caller (`fallback()`,
+e.g. skipping the upscale) is appended to the list opened by `decisions()`, so
+a response can say what happened on its behalf; they're also counted in
+/metrics.
+
+Env:
+  RESILIENCE_RETRIES              attempts per call (default 3); RESILIENCE_<PROVIDER>_RETRIES overrides
+  RESILIENCE_BACKOFF_S            first backoff ceiling in seconds (default 0.5)
+  RESILIENCE_BACKOFF_MAX_S        backoff cap (default 8)
+  RESILIENCE_HEDGE_PROVIDERS      comma-separated providers to hedge, e.g. "flux,gemini" (default none)
+  RESILIENCE_HEDGE_MIN_SAMPLES    latencies seen before hedging starts (default 20)
+  CIRCUIT_FAILURES                consecutive faults that open a breaker (default 5)
+  CIRCUIT_COOLDOWN_S              seconds a breaker stays open before probing (default 30)
+"""
+import asyncio, collections, contextlib, contextvars, os, random, time
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional
+
+import httpx
+
+from . import metrics
+from ._env import env_float
+
+_MAX_DECISIONS = 200  # per request; the metrics counters still see everything
+
+_decisions: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar("resilience_decisions", default=None)
+
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} circuit open; failing fast")
+        self.provider = provider
+
+
+def _short(e: BaseException) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP {e.response.status_code}"
+    return f"{type(e).__name__}: {e}"[:200]
+
+
+@contextlib.contextmanager
+def decisions() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the resilience decisions made for this request (and tasks spawned from it)."""
+    dec: List[Dict[str, Any]] = []
+    token = _decisions.set(dec)
+    try:
+        yield dec
+    finally:
+        _decisions.reset(token)
+
+
+def record(provider: str, decision: str, **info: Any) -> None:
+    metrics.inc("influencer_resilience_decisions_total", help_text="Retries, hedges, fast failures and fallbacks per provider", provider=provider, decision=decision)
+    dec = _decisions.get()
+    if dec is not None and len(dec) < _MAX_DECISIONS:
+        dec.append({"provider": provider, "decision": decision, **info})
+
+
+def fallback(provider: str, action: str, error: BaseException) -> None:
+    """Note that the caller degraded instead of failing (e.g. kept the un-upscaled image)."""
+    metrics.swallowed(provider)
+    record(provider, "fallback", action=action, error=_short(error))
+
+
+def _provider_fault(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code in (408, 429)
+    return isinstance(e, httpx.TransportError)
+
+
+def _never_sent(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429
+    return isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def _retry_after(e: BaseException) -> Optional[float]:
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+        try:
+            return max(0.0, float(e.response.headers.get("retry-after") or ""))
+        except ValueError:
+            return None
+    return None
+
+
+class _Breaker:
+    def __init__(self, provider: str, threshold: int, cooldown_s: float):
+        self.provider = provider
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.trips = 0
+
+    def _set(self, state: str) -> None:
+        delta = int(state == "open") - int(self.state == "open")
+        self.state = state
+        metrics.gauge_add("influencer_circuit_open", delta, help_text="1 while a provider's circuit breaker is open", provider=self.provider)
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_s:
+            self._set("half_open")
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def done(self, fault: Optional[bool]) -> None:
+        """fault: True/False for a provider fault/success, None when the outcome says nothing (cancelled, 4xx)."""
+        self.probing = False
+        if fault is None:
+            return
+        if not fault:
+            self.failures = 0
+            if self.state != "closed":
+                self._set("closed")
+            return
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.opened_at = time.monotonic()
+            self._set("open")
+
+
+_breakers: Dict[str, _Breaker] = {}
+_latencies: Dict[str, Deque[float]] = {}
+
+
+def _breaker(provider: str) -> _Breaker:
+    b = _breakers.get(provider)
+    if b is None:
+        b = _breakers[provider] = _Breaker(
+            provider,
+            threshold=max(1, int(env_float("CIRCUIT_FAILURES", 5))),
+            cooldown_s=env_float("CIRCUIT_COOLDOWN_S", 30),
+        )
+    return b
+
+
+def _hedge_delay(provider: str) -> Optional[float]:
+    hedged = {p.strip() for p in (os.getenv("RESILIENCE_HEDGE_PROVIDERS") or "").split(",") if p.strip()}
+    lat = _latencies.get(provider)
+    if provider not in hedged or not lat or len(lat) < max(1, int(env_float("RESILIENCE_HEDGE_MIN_SAMPLES", 20))):
+        return None
+    ordered = sorted(lat)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+async def _timed(provider: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    t0 = time.perf_counter()
+    out = await fn()
+    _latencies.setdefault(provider, collections.deque(maxlen=200)).append(time.perf_counter() - t0)
+    return out
+
+
+async def _hedged(provider: str, fn: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    first = asyncio.ensure_future(_timed(provider, fn))
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return first.result()
+        record(provider, "hedge", after_ms=round(delay * 1000, 1))
+        tasks.append(asyncio.ensure_future(_timed(provider, fn)))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is not first:
+                        record(provider, "hedge_won")
+                    return t.result()
+                error = error or t.exception()
+        raise error  # both attempts failed
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+async def call(provider: str, fn: Callable[[], Awaitable[Any]], *, idempotent: bool) -> Any:
+    """Run a provider round trip with retries, optional hedging and the provider's breaker."""
+    breaker = _breaker(provider)
+    attempts = max(1, int(env_float(f"RESILIENCE_{provider.upper()}_RETRIES", env_float("RESILIENCE_RETRIES", 3))))
+    base = env_float("RESILIENCE_BACKOFF_S", 0.5)
+    cap = env_float("RESILIENCE_BACKOFF_MAX_S", 8)
+    for attempt in range(1, attempts + 1):
+        if not breaker.allow():
+            record(provider, "circuit_open")
+            raise CircuitOpen(provider)
+        fault: Optional[bool] = None
+        try:
+            delay = _hedge_delay(provider) if idempotent else None
+            out = await (_hedged(provider, fn, delay) if delay is not None else _timed(provider, fn))
+            fault = False
+            return out
+        except Exception as e:
+            fault = True if _provider_fault(e) else None
+            if fault is None or attempt == attempts or not (idempotent or _never_sent(e)):
+                raise
+            wait = _retry_after(e)
+            if wait is None:
+                wait = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+            record(provider, "retry", attempt=attempt, error=_short(e), backoff_ms=round(min(wait, cap) * 1000, 1))
+        finally:
+            breaker.done(fault)
+        await asyncio.sleep(min(wait, cap))
+
+
+def stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for provider, b in list(_breakers.items()):
+        lat = sorted(_latencies.get(provider) or [])
+        out[provider] = {
+            "circuit": b.state,
+            "consecutive_failures": b.failures,
+            "trips": b.trips,
+            "recent_p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 1) if lat else None,
+            "hedge_after_ms": round(d * 1000, 1) if (d := _hedge_delay(provider)) is not None else None,
+        }
+    return {"providers": out, "at": time.time()}
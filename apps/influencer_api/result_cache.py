@@ -0,0 +1,158 @@
+"""On-disk, content-addressed cache for provider image results.
+
+Seeded FLUX calls, upscales and Gemini composes are pure functions of their
+inputs, so the encoded output image is stored under a sha256 of everything
+that determines it (provider, endpoint, prompt, negative prompt, seed,
+dimensions, input image bytes, ...). The directory is size-bounded with LRU
+eviction (file mtime is bumped on every hit) and entries can optionally expire.
+
+Env:
+  RESULT_CACHE_ENABLED   "false" turns the cache off (default on)
+  RESULT_CACHE_DIR       cache directory (default <tmp>/influencer_result_cache)
+  RESULT_CACHE_MAX_MB    size bound before LRU eviction (default 2048)
+  RESULT_CACHE_TTL_S     max entry age in seconds, 0 = never expire (default 0)
+
+Writes go through a temp file + rename, so several uvicorn workers can share
+one directory.
+"""
+import hashlib, json, os, tempfile, threading, time
+from typing import Any, Dict, Optional
+
+from ._env import env_float
+
+
+def _hash_part(v: Any) -> Any:
+    # Large inputs (image bytes, data URLs) are folded to their digest
+    if isinstance(v, (bytes, bytearray)):
+        return "sha256:" + hashlib.sha256(v).hexdigest()
+    if isinstance(v, str) and len(v) > 512:
+        return "sha256:" + hashlib.sha256(v.encode("utf-8")).hexdigest()
+    return v
+
+
+def cache_key(provider: str, endpoint: str, **parts: Any) -> str:
+    """Stable content address for one provider call."""
+    doc = {"provider": provider, "endpoint": endpoint, **{k: _hash_part(v) for k, v in sorted(parts.items())}}
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root: str, max_bytes: int, ttl_s: float = 0.0, enabled: bool = True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _entries(self):
+        for dirpath, _, names in os.walk(self.root):
+            for n in names:
+                if n.startswith(".tmp"):
+                    continue
+                p = os.path.join(dirpath, n)
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                yield p, st.st_size, st.st_mtime
+
+    def _ensure_size(self) -> int:
+        if self._size is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._size = sum(sz for _, sz, _ in self._entries())
+        return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        p = self._path(key)
+        try:
+            st = os.stat(p)
+            if self.ttl_s and time.time() - st.st_mtime > self.ttl_s:
+                self._remove(p, st.st_size)
+                raise FileNotFoundError(p)
+            with open(p, "rb") as f:
+                data = f.read()
+            os.utime(p)  # LRU: most recently used survives eviction
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+        p = self._path(key)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(p))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, p)
+        with self._lock:
+            self.writes += 1
+            self._size = self._ensure_size() + len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self._evict()
+
+    def _remove(self, p: str, size: int) -> None:
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._size = max(0, (self._size or 0) - size)
+            self.evictions += 1
+
+    def _evict(self) -> None:
+        # Re-scan so entries written by other workers are accounted for too
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(sz for _, sz, _ in entries)
+        with self._lock:
+            self._size = total
+        now = time.time()
+        # Drop expired entries first, then least-recently-used until 90% of the bound
+        target = int(self.max_bytes * 0.9)
+        for p, sz, mtime in entries:
+            expired = bool(self.ttl_s) and now - mtime > self.ttl_s
+            if not expired and total <= target:
+                continue
+            self._remove(p, sz)
+            total -= sz
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._ensure_size() if self.enabled else 0
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "dir": self.root,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+            }
+
+
+def from_env() -> ResultCache:
+    return ResultCache(
+        root=os.getenv("RESULT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "influencer_result_cache"),
+        max_bytes=int(env_float("RESULT_CACHE_MAX_MB", 2048) * 1024 * 1024),
+        ttl_s=env_float("RESULT_CACHE_TTL_S", 0),
+        enabled=(os.getenv("RESULT_CACHE_ENABLED", "true").lower() != "false"),
+    )
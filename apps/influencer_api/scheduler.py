@@ -0,0 +1,213 @@
+"""Admission control for provider calls: rate limits, in-flight caps, priorities.
+
+Every call to a scheduled provider (http_pool routes through `slot()`) first
+takes a token from that provider's bucket and a free in-flight slot. When
+either is exhausted the call queues, and queued calls are admitted by
+priority class, then arrival order -- so a preview click waits behind other
+previews, not behind the 24 queued variants of a character build. A few
+in-flight slots can be held back for interactive work, so a running batch
+can't occupy all of them.
+
+The class comes from the caller's context: endpoints run "interactive" by
+default, and long jobs wrap themselves in `priority("batch")`, which tasks
+spawned from them inherit.
+
+Queue depth, in-flight and wait time are exported via metrics (and
+`stats()`); a call that had to wait also shows up in the request's timeline as
+"<provider>_queue_wait".
+
+Env (per provider, upper-cased name):
+  SCHED_<PROVIDER>_RPS            sustained requests/second; 0 = no rate limit
+  SCHED_<PROVIDER>_BURST          bucket size (default max(1, RPS))
+  SCHED_<PROVIDER>_MAX_INFLIGHT   concurrent requests; 0 = unlimited
+  SCHED_INTERACTIVE_RESERVE       in-flight slots batch work may not take (default 1)
+"""
+import asyncio, contextlib, contextvars, heapq, itertools, time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from ._env import env_float
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# provider -> (default requests/second, default max in-flight); unlisted providers are not scheduled
+PROVIDERS: Dict[str, tuple] = {
+    "flux": (0, 16),
+    "upscaler": (0, 8),
+    "gemini": (0, 8),
+    "higgsfield": (0, 8),
+    "gpu": (0, 16),
+}
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("scheduler_priority", default="interactive")
+
+
+@contextlib.contextmanager
+def priority(name: str) -> Iterator[None]:
+    """Run the block (and tasks spawned from it) at the given priority class."""
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority {name!r}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class _Limiter:
+    """Token bucket plus in-flight cap with a priority-ordered wait queue (event-loop only)."""
+
+    def __init__(self, provider: str, rps: float, burst: float, max_inflight: int, reserve: int):
+        self.provider = provider
+        self.rps = rps
+        self.burst = burst
+        self.max_inflight = max_inflight
+        # Never hold back every slot, or batch work could not run at all
+        self.reserve = min(reserve, max_inflight - 1) if max_inflight else 0
+        self.tokens = burst
+        self.inflight = 0
+        self.admitted = 0
+        self._refilled = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.depth = {p: 0 for p in PRIORITIES}
+
+    def _refill(self) -> None:
+        if not self.rps:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rps)
+        self._refilled = now
+
+    def _can_admit(self, prio: int) -> bool:
+        if self.max_inflight:
+            cap = self.max_inflight - (self.reserve if prio > 0 else 0)
+            if self.inflight >= cap:
+                return False
+        if self.rps:
+            self._refill()
+            if self.tokens < 1:
+                return False
+        return True
+
+    def _take(self) -> None:
+        self.inflight += 1
+        self.admitted += 1
+        if self.rps:
+            self.tokens -= 1
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            prio, _, fut = self._waiters[0]
+            if fut.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_admit(prio):
+                # Out of tokens (not slots): come back when the next one has accrued
+                if self.rps and self.tokens < 1 and (not self.max_inflight or self.inflight < self.max_inflight):
+                    delay = (1 - self.tokens) / self.rps
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._take()
+            fut.set_result(None)
+
+    def release(self) -> None:
+        self.inflight -= 1
+        if self._waiters and self._timer is None:
+            self._dispatch()
+
+    async def acquire(self, prio_name: str) -> float:
+        """Wait for admission; returns seconds spent queued."""
+        prio = PRIORITIES.get(prio_name, 0)
+        # Queue behind anyone already waiting at the same or a higher priority
+        if not any(p <= prio and not f.done() for p, _, f in self._waiters) and self._can_admit(prio):
+            self._take()
+            return 0.0
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (prio, next(self._seq), fut))
+        self.depth[prio_name] += 1
+        metrics.gauge_add("influencer_sched_queue_depth", 1, help_text="Provider calls waiting for admission", provider=self.provider, priority=prio_name)
+        t0 = time.perf_counter()
+        try:
+            with metrics.stage(f"{self.provider}_queue_wait"):
+                if self._timer is None:
+                    self._dispatch()
+                await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # admitted just as we were cancelled
+            else:
+                fut.cancel()
+            raise
+        finally:
+            self.depth[prio_name] -= 1
+            metrics.gauge_add("influencer_sched_queue_depth", -1, provider=self.provider, priority=prio_name)
+        return time.perf_counter() - t0
+
+
+_limiters: Dict[str, Optional[_Limiter]] = {}
+
+
+def _limiter(provider: str) -> Optional[_Limiter]:
+    if provider in _limiters:
+        return _limiters[provider]
+    lim = None
+    if provider in PROVIDERS:
+        rps, inflight = PROVIDERS[provider]
+        key = provider.upper()
+        rps = max(0.0, env_float(f"SCHED_{key}_RPS", rps))
+        inflight = max(0, int(env_float(f"SCHED_{key}_MAX_INFLIGHT", inflight)))
+        if rps or inflight:
+            lim = _Limiter(
+                provider, rps,
+                burst=max(1.0, env_float(f"SCHED_{key}_BURST", max(1.0, rps))),
+                max_inflight=inflight,
+                reserve=max(0, int(env_float("SCHED_INTERACTIVE_RESERVE", 1))),
+            )
+    _limiters[provider] = lim
+    return lim
+
+
+@contextlib.asynccontextmanager
+async def slot(provider: str) -> AsyncIterator[None]:
+    """Hold an admission slot for one provider request; a no-op for unscheduled providers."""
+    lim = _limiter(provider)
+    if lim is None:
+        yield
+        return
+    prio = _priority.get()
+    waited = await lim.acquire(prio)
+    metrics.observe("influencer_sched_wait_seconds", waited, help_text="Time provider calls spent queued for admission", provider=provider, priority=prio)
+    metrics.gauge_add("influencer_sched_inflight", 1, help_text="Provider calls admitted and running", provider=provider)
+    try:
+        yield
+    finally:
+        metrics.gauge_add("influencer_sched_inflight", -1, provider=provider)
+        lim.release()
+
+
+def stats() -> Dict[str, Any]:
+    """Per-provider limits, in-flight count, queue depth by priority and tokens left."""
+    out: Dict[str, Any] = {}
+    for provider, lim in list(_limiters.items()):
+        if lim is None:
+            continue
+        lim._refill()
+        out[provider] = {
+            "rps": lim.rps or None,
+            "burst": lim.burst if lim.rps else None,
+            "max_inflight": lim.max_inflight or None,
+            "interactive_reserve": lim.reserve,
+            "inflight": lim.inflight,
+            "queued": dict(lim.depth),
+            "tokens": round(lim.tokens, 2) if lim.rps else None,
+            "admitted": lim.admitted,
+        }
+    return {"providers": out, "at": time.time()}
@@ -0,0 +1,121 @@
+"""Cold-start timing, and provider clients that load on first use.
+
+Heavy SDKs (OpenAI's client pulls in hundreds of type modules) are wrapped in
+`lazy()`: nothing is imported until the first request needs the client, or
+until the background warm-up gets to it shortly after the server starts
+accepting connections -- whichever comes first. Loading happens in a worker
+thread, so it never stalls the event loop.
+
+`mark(name)` closes a timed segment of module import / initialisation; the
+first segment runs from process start (interpreter and server imports) to
+this module's import. `report()` (GET /startup-stats) lists the segments, the
+time to the startup event, and how long each lazy client took to load and
+whether a request or the warm-up paid for it.
+
+Env:
+  STARTUP_WARMUP            "false" leaves every lazy client to its first request (default on)
+  STARTUP_WARMUP_DELAY_S    seconds after startup before warming (default 1)
+"""
+import asyncio, os, threading, time
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+from ._env import env_float
+
+_UNSET = object()
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux /proc), or None."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = float(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_age_at_import = _process_age()
+_t0 = time.perf_counter() - (_age_at_import or 0.0)  # perf_counter value at process start (approx.)
+_last = time.perf_counter()
+_segments: List[Dict[str, Any]] = [{"name": "interpreter+server", "ms": round(_age_at_import * 1000, 1) if _age_at_import is not None else None}]
+_ready_s: Optional[float] = None
+_lazies: List["Lazy"] = []
+
+
+def mark(name: str) -> None:
+    """Close the segment that started at the previous mark, naming it `name`."""
+    global _last
+    now = time.perf_counter()
+    _segments.append({"name": name, "ms": round((now - _last) * 1000, 1)})
+    _last = now
+
+
+def ready() -> None:
+    """Record that the app finished its startup event."""
+    global _ready_s
+    mark("app_startup")
+    _ready_s = time.perf_counter() - _t0
+
+
+class Lazy:
+    """A value built by `factory` on first use (once, even under concurrent callers)."""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self._value: Any = _UNSET
+        self._lock = threading.Lock()
+        self.load_ms: Optional[float] = None
+        self.loaded_by: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNSET
+
+    def get(self, _by: str = "request") -> Any:
+        if self._value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    t = time.perf_counter()
+                    value = self.factory()
+                    self.load_ms = round((time.perf_counter() - t) * 1000, 1)
+                    self.loaded_by = _by
+                    self._value = value
+        return self._value
+
+    async def aget(self) -> Any:
+        """`get()` for async code: a first load runs in a worker thread."""
+        if self._value is not _UNSET:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+
+def lazy(name: str, factory: Callable[[], Any]) -> Lazy:
+    lz = Lazy(name, factory)
+    _lazies.append(lz)
+    return lz
+
+
+async def warm_up() -> None:
+    """Load every lazy value in the background, one at a time; failures are left to the first request."""
+    if os.getenv("STARTUP_WARMUP", "true").lower() == "false":
+        return
+    # Startup hooks run before the socket is bound; give the server time to start accepting first
+    await asyncio.sleep(env_float("STARTUP_WARMUP_DELAY_S", 1))
+    for lz in list(_lazies):
+        if not lz.loaded:
+            try:
+                await asyncio.to_thread(lz.get, "warmup")
+            except Exception:
+                metrics.swallowed("warmup")
+
+
+def report() -> Dict[str, Any]:
+    return {
+        "segments": _segments,
+        "ready_ms": round(_ready_s * 1000, 1) if _ready_s is not None else None,
+        "lazy": {lz.name: {"loaded": lz.loaded, "load_ms": lz.load_ms, "loaded_by": lz.loaded_by} for lz in _lazies},
+    }
@@ -0,0 +1,206 @@
+"""Supabase Storage uploads that stream from disk.
+
+Small files go up as one streamed PUT. Files at or above the resumable
+threshold use Supabase's TUS endpoint in fixed-size chunks: when a chunk
+fails, the server is asked for its current offset and only the missing tail
+is re-sent, so a network hiccup near the end of a large video doesn't restart
+the upload. Memory per upload is bounded by one chunk either way.
+
+With dedupe on, each file is hashed first and stored under
+<top-level prefix>/by-hash/<sha256><ext>; when that object already exists the
+upload is skipped and the existing URL is returned. Identical files uploaded
+at the same time (a moodboard listed twice, two bundles for one username)
+share one upload, and content-addressed writes upsert: a racing writer from
+another worker stores the same bytes, so overwriting is harmless where a
+plain PUT would fail with Duplicate.
+
+Env:
+  SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_SERVICE_KEY)
+  SUPABASE_STORAGE_BUCKET           bucket (default influencer)
+  SUPABASE_RESUMABLE_THRESHOLD_MB   files this large use TUS (default 6)
+  SUPABASE_CHUNK_MB                 TUS chunk size; Supabase expects 6 (default 6)
+  SUPABASE_UPLOAD_RETRIES           attempts per request/chunk (default 5)
+  SUPABASE_DEDUPE                   "false" keeps caller keys and always uploads (default true)
+"""
+import asyncio, base64, hashlib, os
+from typing import AsyncIterator, Dict, Optional, Set
+
+import httpx
+
+from . import http_pool
+from ._env import env_float
+
+_READ_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_at(path: str, offset: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+async def _stream_file(path: str) -> AsyncIterator[bytes]:
+    offset = 0
+    while True:
+        block = await asyncio.to_thread(_read_at, path, offset, _READ_SIZE)
+        if not block:
+            return
+        offset += len(block)
+        yield block
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code in (408, 409, 429)
+    return isinstance(e, httpx.TransportError)
+
+
+class SupabaseStorage:
+    def __init__(self, url: str, key: str, bucket: str, *, resumable_threshold: int, chunk_size: int, retries: int, dedupe: bool):
+        self.base = url.rstrip("/")
+        self.key = key
+        self.bucket = bucket
+        self.resumable_threshold = resumable_threshold
+        self.chunk_size = chunk_size
+        self.retries = max(1, retries)
+        self.dedupe = dedupe
+        self._known: Set[str] = set()  # object keys known to exist
+        self._inflight: Dict[str, asyncio.Task] = {}  # content-addressed key -> its upload
+
+    def public_url(self, path_key: str) -> str:
+        # Assume bucket is public
+        return f"{self.base}/storage/v1/object/public/{self.bucket}/{path_key}"
+
+    def _object_url(self, path_key: str) -> str:
+        return f"{self.base}/storage/v1/object/{self.bucket}/{path_key}"
+
+    def _auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.key}"}
+
+    async def _retry(self, attempt_fn):
+        delay = 0.5
+        for attempt in range(self.retries):
+            try:
+                return await attempt_fn()
+            except Exception as e:
+                if attempt == self.retries - 1 or not _retryable(e):
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 8.0)
+
+    async def upload_bytes(self, path_key: str, data: bytes, content_type: str) -> str:
+        async def _put():
+            r = await http_pool.request("supabase", "PUT", self._object_url(path_key), headers={**self._auth(), "Content-Type": content_type}, content=data)
+            r.raise_for_status()
+        await self._retry(_put)
+        return self.public_url(path_key)
+
+    async def _exists(self, path_key: str) -> bool:
+        if path_key in self._known:
+            return True
+        r = await http_pool.request("supabase", "HEAD", self._object_url(path_key), headers=self._auth())
+        if r.status_code == 200:
+            self._known.add(path_key)
+            return True
+        return False
+
+    async def upload_file(self, path_key: str, path: str, content_type: str) -> str:
+        """Upload a file from disk without loading it whole; returns its public URL."""
+        if self.dedupe:
+            digest = await asyncio.to_thread(sha256_file, path)
+            top = path_key.split("/", 1)[0] + "/" if "/" in path_key else ""
+            path_key = f"{top}by-hash/{digest}{os.path.splitext(path_key)[1]}"
+            task = self._inflight.get(path_key)
+            if task is None:
+                task = asyncio.ensure_future(self._upload_new(path_key, path, content_type, upsert=True))
+                self._inflight[path_key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(path_key, None))
+            await asyncio.shield(task)
+        else:
+            await self._upload_new(path_key, path, content_type, upsert=False)
+        return self.public_url(path_key)
+
+    async def _upload_new(self, path_key: str, path: str, content_type: str, *, upsert: bool) -> None:
+        if upsert and await self._exists(path_key):
+            return
+        size = (await asyncio.to_thread(os.stat, path)).st_size
+        if size >= self.resumable_threshold:
+            await self._tus_upload(path_key, path, size, content_type)
+        else:
+            headers = {**self._auth(), "Content-Type": content_type, "Content-Length": str(size)}
+            if upsert:
+                headers["x-upsert"] = "true"
+
+            async def _put():
+                r = await http_pool.request("supabase", "PUT", self._object_url(path_key), headers=headers, content=_stream_file(path))
+                r.raise_for_status()
+            await self._retry(_put)
+        self._known.add(path_key)
+
+    async def _tus_upload(self, path_key: str, path: str, size: int, content_type: str) -> None:
+        tus = {**self._auth(), "Tus-Resumable": "1.0.0"}
+        meta = ",".join(
+            f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}"
+            for k, v in (("bucketName", self.bucket), ("objectName", path_key), ("contentType", content_type))
+        )
+
+        async def _create() -> str:
+            r = await http_pool.request(
+                "supabase", "POST", f"{self.base}/storage/v1/upload/resumable",
+                headers={**tus, "Upload-Length": str(size), "Upload-Metadata": meta, "x-upsert": "true"},
+            )
+            r.raise_for_status()
+            loc = r.headers.get("location")
+            if not loc:
+                raise RuntimeError("Supabase resumable upload returned no Location")
+            return loc if loc.startswith("http") else self.base + loc
+
+        upload_url = await self._retry(_create)
+        offset, failures, delay = 0, 0, 0.5
+        while offset < size:
+            try:
+                chunk = await asyncio.to_thread(_read_at, path, offset, self.chunk_size)
+                r = await http_pool.request(
+                    "supabase", "PATCH", upload_url,
+                    headers={**tus, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"},
+                    content=chunk,
+                )
+                r.raise_for_status()
+                offset = int(r.headers.get("upload-offset") or offset + len(chunk))
+                failures, delay = 0, 0.5
+            except Exception as e:
+                failures += 1
+                if failures >= self.retries or not _retryable(e):
+                    raise
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 8.0)
+                # Resume from whatever the server actually committed
+                try:
+                    h = await http_pool.request("supabase", "HEAD", upload_url, headers=tus)
+                except httpx.HTTPError:
+                    continue
+                if h.status_code == 200 and h.headers.get("upload-offset"):
+                    offset = int(h.headers["upload-offset"])
+
+
+def from_env() -> Optional[SupabaseStorage]:
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_SERVICE_KEY")
+    if not (url and key):
+        return None
+    mb = 1024 * 1024
+    return SupabaseStorage(
+        url, key, os.getenv("SUPABASE_STORAGE_BUCKET", "influencer"),
+        resumable_threshold=int(env_float("SUPABASE_RESUMABLE_THRESHOLD_MB", 6) * mb),
+        chunk_size=max(mb, int(env_float("SUPABASE_CHUNK_MB", 6) * mb)),
+        retries=int(env_float("SUPABASE_UPLOAD_RETRIES", 5)),
+        dedupe=(os.getenv("SUPABASE_DEDUPE", "true").lower() != "false"),
+    )
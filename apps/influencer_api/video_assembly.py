@@ -0,0 +1,94 @@
+"""Local slideshow assembly that streams frames straight into ffmpeg.
+
+Each distinct still is decoded, fitted to the output canvas and converted to
+raw RGB exactly once; held frames re-send that same buffer and crossfade
+frames are blended one at a time. Memory is bounded by the distinct stills
+still waiting to be shown (at the capped canvas size), never by duration,
+fps or the stills' original resolution.
+
+Env:
+  VIDEO_MAX_SIDE      longest output side in pixels (default 1280)
+  VIDEO_X264_PRESET   libx264 preset (default fast)
+  VIDEO_CRF           libx264 constant rate factor (default 20)
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import imageio_ffmpeg
+from PIL import Image, ImageOps
+
+from .imaging import ImageRef
+from ._env import env_int
+
+
+def frame_counts(n: int, fps: int, seconds: float, hold_s: Optional[Sequence[float]] = None) -> List[int]:
+    """Frames per still: explicit holds (the last one repeats), else `seconds` split evenly."""
+    if hold_s:
+        holds = [float(hold_s[min(i, len(hold_s) - 1)]) for i in range(n)]
+    else:
+        holds = [seconds / n] * n
+    return [max(1, round(h * fps)) for h in holds]
+
+
+def _canvas(size: Tuple[int, int]) -> Tuple[int, int]:
+    # yuv420p needs even dimensions
+    w, h = size
+    return max(2, w - w % 2), max(2, h - h % 2)
+
+
+def assemble(
+    images: Sequence[ImageRef],
+    out_path: str,
+    *,
+    fps: int = 24,
+    seconds: float = 5.0,
+    hold_s: Optional[Sequence[float]] = None,
+    crossfade_s: float = 0.0,
+    max_side: Optional[int] = None,
+) -> str:
+    """Encode `images` as an H.264 MP4 slideshow at `out_path` (extension must be .mp4)."""
+    if not images:
+        raise ValueError("No stills to assemble")
+    max_side = max_side or env_int("VIDEO_MAX_SIDE", 1280)
+    counts = frame_counts(len(images), fps, seconds, hold_s)
+    last_use = {id(im): i for i, im in enumerate(images)}
+    prepared: Dict[int, Tuple[Image.Image, bytes]] = {}
+    size: Optional[Tuple[int, int]] = None
+
+    def _prepared(i: int) -> Tuple[Image.Image, bytes]:
+        nonlocal size
+        key = id(images[i])
+        if key not in prepared:
+            img = images[i].decode(max_side)
+            if size is None:
+                size = _canvas(img.size)  # the first still sets the canvas
+            if img.size != size:
+                img = ImageOps.pad(img, size, color=(0, 0, 0))
+            prepared[key] = (img, img.tobytes())
+        return prepared[key]
+
+    _prepared(0)
+    writer = imageio_ffmpeg.write_frames(
+        out_path, size, fps=fps, codec="libx264", quality=None, macro_block_size=2,
+        ffmpeg_log_level="error",
+        output_params=[
+            "-preset", os.getenv("VIDEO_X264_PRESET") or "fast",
+            "-crf", str(env_int("VIDEO_CRF", 20)),
+            "-movflags", "+faststart",  # moov up front so ranged playback starts immediately
+        ],
+    )
+    writer.send(None)
+    try:
+        for i, n in enumerate(counts):
+            img, raw = _prepared(i)
+            nxt = _prepared(i + 1) if crossfade_s > 0 and i + 1 < len(images) else None
+            fade = min(round(crossfade_s * fps), n - 1) if nxt else 0
+            for _ in range(n - fade):
+                writer.send(raw)
+            for k in range(fade):
+                writer.send(Image.blend(img, nxt[0], (k + 1) / (fade + 1)).tobytes())
+            if last_use[id(images[i])] == i:
+                prepared.pop(id(images[i]), None)
+    finally:
+        writer.close()
+    return out_path
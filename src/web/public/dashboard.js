@@ -2463,14 +2463,24 @@ async function uiCreateCharacter(){
         const bj = await br.json(); if (!br.ok || bj.success === false) throw new Error(bj.error||'build failed');
         const job = bj.job_id;
         showInfo('Character building…');
-        // poll
+        // Stream status + variants as they land; fall back to cursor polling without EventSource
+        if (window.EventSource) return streamCharacterBuild(job);
         const start = Date.now();
+        let cursor = 0, base = null;
+        const variants = [];
         const poll = async ()=>{
-            const sr = await fetch('/api/character/build-status?job_id='+encodeURIComponent(job));
+            const sr = await fetch('/api/character/build-status?job_id='+encodeURIComponent(job)+'&cursor='+cursor);
             const sj = await sr.json();
-            if (sj.status === 'completed'){ showSuccess('Character ready'); renderCharacterPreview(sj.base, sj.variants||[]); }
+            cursor = sj.cursor || cursor;
+            (sj.variants||[]).forEach(v => { variants[v.index] = v.url; });
+            if (sj.base && sj.base !== base) base = sj.base;
+            if (sj.status === 'completed'){ showSuccess('Character ready'); renderCharacterPreview(base, variants.filter(Boolean)); }
             else if (sj.status === 'failed'){ showError('Character build failed: '+(sj.error||'-')); }
-            else if (Date.now()-start < 600000){ setTimeout(poll, 1500); }
+            else if (Date.now()-start < 600000){
+                // Show the base and finished variants while the rest are still generating
+                if (base) renderCharacterPreview(base, variants.filter(Boolean));
+                setTimeout(poll, 1500);
+            }
             else { showError('Character build timed out'); }
         };
         setTimeout(poll, 1500);
@@ -2507,6 +2517,34 @@ async function uiGenerateVideo(){
     }catch(e){ showError(e.message); }
 }
 
+function streamCharacterBuild(job){
+    const es = new EventSource('/api/character/build-events?job_id='+encodeURIComponent(job));
+    let base = null;
+    const variants = [];
+    const timer = setTimeout(()=>{ es.close(); showError('Character build timed out'); }, 600000);
+    es.addEventListener('status', ev => {
+        const sj = JSON.parse(ev.data);
+        if (sj.base && sj.base !== base){ base = sj.base; renderCharacterPreview(base, variants.filter(Boolean)); }
+    });
+    es.addEventListener('variant', ev => {
+        const v = JSON.parse(ev.data);
+        variants[v.index] = v.url;
+        if (base) renderCharacterPreview(base, variants.filter(Boolean));
+    });
+    es.addEventListener('done', ev => {
+        const d = JSON.parse(ev.data);
+        es.close(); clearTimeout(timer);
+        if (d.status === 'completed') showSuccess('Character ready');
+        else showError('Character build failed: '+(d.error||'-'));
+    });
+    es.addEventListener('error', ev => {
+        // Server-sent error events carry data; transport errors let EventSource reconnect on its own
+        if (!ev.data) return;
+        es.close(); clearTimeout(timer);
+        showError('Character build failed: '+(JSON.parse(ev.data).error||'-'));
+    });
+}
+
 function renderCharacterPreview(baseUrl, variants){
     const grid = document.getElementById('generatedContent');
     document.getElementById('generationPreview').style.display = 'block';
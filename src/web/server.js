@@ -1,5 +1,6 @@
 import express from 'express';
 import path from 'path';
+import { Readable } from 'stream';
 import { fileURLToPath } from 'url';
 import dotenv from 'dotenv';
 import { SupabaseClient } from '../database/supabase-client.js';
@@ -1016,7 +1017,9 @@ app.get('/api/character/build-status', async (req, res) => {
   try {
     if (!requireInfluencerApi(res)) return;
     const t0 = Date.now();
-    const qs = new URLSearchParams({ job_id: String(req.query.job_id||'') }).toString();
+    const params = { job_id: String(req.query.job_id||'') };
+    if (req.query.cursor !== undefined) params.cursor = String(req.query.cursor);
+    const qs = new URLSearchParams(params).toString();
     const r = await fetch(`${INFLUENCER_API_BASE}/character/build-status?${qs}`);
     const j = await r.json().catch(()=>({ error:'invalid json' }));
     const ms = Date.now() - t0; logger.info(`[influencer] character/build-status ${r.status} ${ms}ms`);
@@ -1024,6 +1027,44 @@ app.get('/api/character/build-status', async (req, res) => {
   } catch (e) { logger.error('character/build-status failed', e); res.status(500).json({ error: e.message }); }
 });
 
+// Server-sent events for a character build: status transitions and each variant as it lands
+app.get('/api/character/build-events', async (req, res) => {
+  try {
+    if (!requireInfluencerApi(res)) return;
+    const params = { job_id: String(req.query.job_id||''), cursor: String(req.query.cursor||0) };
+    const headers = req.headers['last-event-id'] ? { 'last-event-id': req.headers['last-event-id'] } : {};
+    const ac = new AbortController();
+    req.on('close', () => ac.abort());
+    const r = await fetch(`${INFLUENCER_API_BASE}/character/build-events?${new URLSearchParams(params)}`, { headers, signal: ac.signal });
+    res.status(r.status);
+    res.setHeader('Content-Type', 'text/event-stream');
+    res.setHeader('Cache-Control', 'no-cache');
+    res.flushHeaders();
+    if (!r.body) return res.end();
+    Readable.fromWeb(r.body).on('error', () => res.end()).pipe(res);
+  } catch (e) {
+    if (e.name === 'AbortError') return;
+    logger.error('character/build-events failed', e);
+    if (!res.headersSent) res.status(500).json({ error: e.message }); else res.end();
+  }
+});
+
+// Generated images/videos are served by the influencer API as /artifacts/<id>; proxy them
+// so the relative URLs it returns resolve from the dashboard too.
+app.get('/artifacts/:id', async (req, res) => {
+  try {
+    if (!requireInfluencerApi(res)) return;
+    const headers = req.headers.range ? { range: req.headers.range } : {};
+    const r = await fetch(`${INFLUENCER_API_BASE}/artifacts/${encodeURIComponent(req.params.id)}`, { headers });
+    res.status(r.status);
+    for (const h of ['content-type', 'content-length', 'content-range', 'accept-ranges', 'etag', 'last-modified', 'cache-control']) {
+      const v = r.headers.get(h); if (v) res.setHeader(h, v);
+    }
+    if (!r.body) return res.end();
+    Readable.fromWeb(r.body).pipe(res);
+  } catch (e) { logger.error('artifact proxy failed', e); res.status(502).json({ error: e.message }); }
+});
+
 app.post('/api/still', async (req, res) => {
   try {
     if (!requireInfluencerApi(res)) return;